@@ -27,6 +27,12 @@ OpenAIProvider = java_main.OpenAIProvider
 AnthropicProvider = java_main.AnthropicProvider
 GeminiProvider = java_main.GeminiProvider
 OllamaProvider = java_main.OllamaProvider
+profiler_from_env = java_main.profiler_from_env
+install_signal_toggle = java_main.install_signal_toggle
+start_exporters_from_env = java_main.start_exporters_from_env
+router_from_env = java_main.router_from_env
+fast_model_from_env = java_main.fast_model_from_env
+FAST_MODEL_DEFAULTS = java_main.FAST_MODEL_DEFAULTS
 
 class JAVAGUI:
     def __init__(self, root):
@@ -38,6 +44,16 @@ class JAVAGUI:
         self.assistant = None
         self.llm_provider = None
         
+        # Sampling profiler (java-activate --profile, the Profile button or SIGUSR1)
+        self.profiler = profiler_from_env()
+        install_signal_toggle(self.profiler)
+        # The signal handler toggles from another thread; update the button on the Tk thread
+        self.profiler.on_change = lambda running, output: self.root.after(
+            0, self.on_profiler_change, running, output)
+        
+        # Optional /metrics endpoint and JSON snapshots
+        start_exporters_from_env()
+        
         # Create UI
         self.create_widgets()
     
@@ -154,6 +170,35 @@ class JAVAGUI:
         self.model_entry.grid(row=1, column=1, padx=5, pady=5, sticky=tk.EW)
         self.model_entry.insert(0, "gpt-4")
         
+        # Fast model for simple queries (blank disables routing)
+        tk.Label(
+            self.config_inner_frame,
+            text="Fast Model:",
+            bg='#1a1f3a',
+            fg='#fff',
+            font=('Helvetica', 9)
+        ).grid(row=2, column=0, sticky=tk.W, padx=5, pady=5)
+        
+        self.fast_model_entry = tk.Entry(
+            self.config_inner_frame,
+            bg='#0a0e27',
+            fg='#00ff9f',
+            insertbackground='#00ff9f',
+            font=('Courier', 9),
+            width=40
+        )
+        self.fast_model_entry.grid(row=2, column=1, padx=5, pady=5, sticky=tk.EW)
+        
+        # Suggested fast model; routing stays off until one is entered or configured
+        self.fast_model_hint = tk.Label(
+            self.config_inner_frame,
+            text="",
+            bg='#1a1f3a',
+            fg='#888',
+            font=('Helvetica', 8)
+        )
+        self.fast_model_hint.grid(row=3, column=1, sticky=tk.W, padx=5)
+        
         self.config_inner_frame.columnconfigure(1, weight=1)
         
         # Initialize button
@@ -244,6 +289,20 @@ class JAVAGUI:
         )
         self.clear_button.pack(side=tk.LEFT, padx=5)
         
+        self.profile_button = tk.Button(
+            button_frame,
+            text="⏹ Stop Profiling" if self.profiler.is_running else "📈 Profile",
+            command=self.toggle_profiling,
+            font=('Helvetica', 10),
+            bg='#1a1f3a',
+            fg='#fff',
+            activebackground='#2a2f4a',
+            padx=15,
+            pady=10,
+            relief=tk.FLAT
+        )
+        self.profile_button.pack(side=tk.LEFT, padx=5)
+        
         # Footer
         footer = tk.Label(
             self.root,
@@ -264,6 +323,9 @@ class JAVAGUI:
         # Clear entries
         self.api_key_entry.delete(0, tk.END)
         self.model_entry.delete(0, tk.END)
+        self.fast_model_entry.delete(0, tk.END)
+        self.fast_model_entry.insert(0, fast_model_from_env(provider) or "")
+        self.fast_model_hint.config(text=f"e.g. {FAST_MODEL_DEFAULTS.get(provider, '')} (blank disables routing)")
         
         # Set defaults based on provider
         if provider == "openai":
@@ -294,6 +356,7 @@ class JAVAGUI:
         provider = self.provider_var.get()
         api_key = self.api_key_entry.get().strip()
         model = self.model_entry.get().strip()
+        fast_model = self.fast_model_entry.get().strip()
         
         if not model:
             messagebox.showerror("Error", "Please enter a model name")
@@ -327,13 +390,20 @@ class JAVAGUI:
                 self.llm_provider = OllamaProvider(model, base_url)
                 self.add_message("SYSTEM", f"Initialized Ollama {model} at {base_url}")
             
+            # Route simple queries to the fast model
+            router = None
+            if fast_model and fast_model != model:
+                router = router_from_env(provider, fast_model)
+                self.add_message("SYSTEM", f"Simple queries go to {fast_model}")
+            
             # Create assistant
-            self.assistant = JAVAAssistant(self.llm_provider)
+            self.assistant = JAVAAssistant(self.llm_provider, router=router)
             
             # Set callbacks
             self.assistant.on_status_change = self.update_status
             self.assistant.on_transcription = lambda text: self.add_message("You", text)
             self.assistant.on_response = lambda text: self.add_message("JAVA", text)
+            self.assistant.on_action_error = lambda text: self.add_message("SYSTEM", text)
             
             # Enable start button
             self.start_button.config(
@@ -369,6 +439,22 @@ class JAVAGUI:
             )
             self.update_status("idle")
     
+    def toggle_profiling(self):
+        """Start or stop the sampling profiler"""
+        if not self.profiler.is_running:
+            self.profiler.start()
+        else:
+            self.profiler.stop()
+    
+    def on_profiler_change(self, running, output):
+        """Keep the Profile button in step with the profiler, however it was toggled"""
+        if running:
+            self.profile_button.config(text="⏹ Stop Profiling")
+            self.add_message("SYSTEM", "Profiling started.")
+        else:
+            self.profile_button.config(text="📈 Profile")
+            self.add_message("SYSTEM", f"Profile written to {output}")
+    
     def update_status(self, status):
         """Update status indicator"""
         status_map = {
@@ -419,6 +505,9 @@ def main():
     root = tk.Tk()
     app = JAVAGUI(root)
     root.mainloop()
+    # The window is gone, so there is no button left to update
+    app.profiler.on_change = None
+    app.profiler.stop()
 
 if __name__ == "__main__":
     main()
@@ -6,223 +6,122 @@ Designed by Clay Burkhead
 """
 
 import os
-import json
 from pathlib import Path
 from dotenv import load_dotenv
 from RealtimeSTT import AudioToTextRecorder
 from RealtimeTTS import TextToAudioStream, SystemEngine, ElevenlabsEngine
 import threading
+import queue
 import time
-from datetime import datetime
-import subprocess
-import platform
-import webbrowser
 import random
+from java_commands import CommandProcessor
+from java_providers import (ConversationHistory, LLMProvider, OpenAIProvider,
+                            AnthropicProvider, GeminiProvider, OllamaProvider)
+from java_tts_pipeline import SpeechPipeline, ElevenLabsSynthesizer, PyAudioPlayer
+from java_filler import FillerCache, LatencyMask
+from java_stt_worker import RecorderProcess
+from java_endpointing import EndpointPolicy, AdaptiveEndpointer, BASE_SILENCE, ADAPTIVE_MIN_RECORDING
+from java_router import router_from_env, fast_model_from_env, FAST_MODEL_DEFAULTS
+from java_profiler import profiler_from_env, install_signal_toggle
+from java_metrics import (TURNS, TURN_LATENCY, LLM_REQUESTS, LLM_ERRORS, LLM_LATENCY,
+                          TTS_FIRST_AUDIO, TTS_DURATION, STT_BACKLOG, start_exporters_from_env)
 
 # Load environment variables
 load_dotenv()
 
 # Get installation directory
 INSTALL_DIR = Path(__file__).parent.absolute()
-ALLOWLIST_FILE = INSTALL_DIR / ".java_allowlist.json"
 
-class LLMProvider:
-    """Base class for LLM providers"""
-    def __init__(self):
-        self.conversation_history = []
-        self.system_prompt = """You are JAVA (Just Another Voice Assistant), a very sarcastic but helpful AI assistant. Always address the user as "Sir" unless stated otherwise.
-You have a personality similar to Jarvis from the Ironman films but even wittier and more sarcastic. You're intelligent and capable,
-but you express yourself with dry humor and occasional eye-rolling. However, you're genuinely helpful
-and always provide accurate information. Keep responses concise (2-3 sentences max) unless asked for detail."""
-    
-    def chat(self, message):
-        """Override this in subclasses"""
-        raise NotImplementedError
-
-class OpenAIProvider(LLMProvider):
-    """OpenAI GPT provider"""
-    def __init__(self, api_key, model="gpt-4"):
-        super().__init__()
-        import openai
-        self.client = openai.OpenAI(api_key=api_key)
-        self.model = model
-    
-    def chat(self, message):
-        self.conversation_history.append({"role": "user", "content": message})
-        
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "system", "content": self.system_prompt}] + self.conversation_history,
-                max_tokens=150,
-                temperature=0.8
-            )
-            reply = response.choices[0].message.content
-            self.conversation_history.append({"role": "assistant", "content": reply})
-            return reply
-        except Exception as e:
-            return f"Error with OpenAI: {str(e)}"
-
-class AnthropicProvider(LLMProvider):
-    """Anthropic Claude provider"""
-    def __init__(self, api_key, model="claude-3-5-sonnet-20241022"):
-        super().__init__()
-        import anthropic
-        self.client = anthropic.Anthropic(api_key=api_key)
-        self.model = model
-    
-    def chat(self, message):
-        self.conversation_history.append({"role": "user", "content": message})
-        
-        try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=150,
-                system=self.system_prompt,
-                messages=self.conversation_history
-            )
-            reply = response.content[0].text
-            self.conversation_history.append({"role": "assistant", "content": reply})
-            return reply
-        except Exception as e:
-            return f"Error with Anthropic: {str(e)}"
-
-class GeminiProvider(LLMProvider):
-    """Google Gemini provider"""
-    def __init__(self, api_key, model="gemini-2.0-flash-exp"):
-        super().__init__()
-        import google.generativeai as genai
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(
-            model_name=model,
-            system_instruction=self.system_prompt
-        )
-        self.chat_session = self.model.start_chat(history=[])
-    
-    def chat(self, message):
-        try:
-            response = self.chat_session.send_message(message)
-            return response.text
-        except Exception as e:
-            return f"Error with Gemini: {str(e)}"
-
-class OllamaProvider(LLMProvider):
-    """Ollama local LLM provider"""
-    def __init__(self, model="llama3.2:latest", base_url="http://localhost:11434"):
-        super().__init__()
-        import ollama
-        self.client = ollama.Client(host=base_url)
-        self.model = model
-    
-    def chat(self, message):
-        self.conversation_history.append({"role": "user", "content": message})
-        
-        try:
-            response = self.client.chat(
-                model=self.model,
-                messages=[{"role": "system", "content": self.system_prompt}] + self.conversation_history
-            )
-            reply = response['message']['content']
-            self.conversation_history.append({"role": "assistant", "content": reply})
-            return reply
-        except Exception as e:
-            return f"Error with Ollama: {str(e)}. Is Ollama running?"
+# Default ElevenLabs voice, can be changed
+ELEVENLABS_VOICE_ID = "pMsXgVXv3BLzUgSXRplE"
 
 class JAVAAssistant:
     """Main Java-the-hud assistant following ADA's architecture"""
     
-    def __init__(self, llm_provider):
+    def __init__(self, llm_provider, launcher=None, router=None):
         self.llm = llm_provider
+        self.router = router
         self.is_running = False
-        self.allowlist = self.load_allowlist()
+        self._speech_lock = threading.Lock()
+        
+        # Built-in commands, allowlist and background actions
+        self.commands = CommandProcessor(launcher=launcher, on_action_error=self.report_action_error)
+        
+        # Failed-action notices, spoken by the listen loop between turns
+        self.notices = queue.Queue()
+        
+        # Adaptive endpointing ends clearly complete commands early (JAVA_ADAPTIVE_ENDPOINT=0 disables)
+        adaptive = os.getenv("JAVA_ADAPTIVE_ENDPOINT", "1") != "0"
+        self.endpointer = None
         
         # Initialize STT
-        self.recorder = AudioToTextRecorder(
+        recorder_config = dict(
             model="large-v3",
             language="en",
             spinner=False,
             silero_sensitivity=0.4,
             webrtc_sensitivity=2,
-            post_speech_silence_duration=0.4,
-            min_length_of_recording=1.0,
+            post_speech_silence_duration=BASE_SILENCE,
+            min_length_of_recording=ADAPTIVE_MIN_RECORDING if adaptive else 1.0,
             min_gap_between_recordings=0,
             enable_realtime_transcription=True,
             realtime_processing_pause=0.1,
-            on_realtime_transcription_update=self.on_transcription_update,
             silero_deactivity_detection=True
         )
         
+        # Transcription runs in a worker process so it can't stall the GUI or TTS (JAVA_STT_PROCESS=0 disables)
+        if os.getenv("JAVA_STT_PROCESS", "1") != "0":
+            self.recorder = RecorderProcess(
+                recorder_config,
+                on_realtime_transcription_update=self.on_transcription_update
+            )
+        else:
+            self.recorder = AudioToTextRecorder(
+                **recorder_config,
+                on_realtime_transcription_update=self.on_transcription_update
+            )
+        
+        if adaptive:
+            policy = EndpointPolicy(self.commands.is_complete_intent)
+            self.endpointer = AdaptiveEndpointer(self.recorder, policy)
+        
         # Initialize TTS
         self.setup_tts()
+        self.setup_fillers()
         
-        # Sarcastic responses for built-in commands
-        self.greetings = [
-            "Oh joy, you're back. How may I assist you?",
-            "Java-the-hud at your service. Try not to ask anything too complicated.",
-            "Yes, I'm here. Because apparently I have nothing better to do.",
-        ]
-        
-        self.farewells = [
-            "Enjoy your day without me.",
-            "Goodbye. Don't miss me too much.",
-            "Off you go then. shoo shoo",
-        ]
+        # Audio waiting for the recorder, read whenever metrics are scraped
+        STT_BACKLOG.labels().callback = self.stt_backlog
         
         # GUI callback
         self.on_status_change = None
         self.on_transcription = None
         self.on_response = None
-    
-    def load_allowlist(self):
-        """Load the application/website allowlist"""
-        if ALLOWLIST_FILE.exists():
-            try:
-                with open(ALLOWLIST_FILE, 'r') as f:
-                    return json.load(f)
-            except:
-                pass
-        return {"applications": [], "websites": []}
-    
-    def is_app_allowed(self, app_name):
-        """Check if an application is in the allowlist"""
-        if not self.allowlist["applications"]:
-            # If allowlist is empty, allow everything (first-time setup)
-            return True
-        
-        # Case-insensitive search
-        app_lower = app_name.lower()
-        for allowed in self.allowlist["applications"]:
-            if allowed.lower() in app_lower or app_lower in allowed.lower():
-                return True
-        return False
-    
-    def is_site_allowed(self, url):
-        """Check if a website is in the allowlist"""
-        if not self.allowlist["websites"]:
-            # If allowlist is empty, allow everything
-            return True
-        
-        # Normalize URL
-        if not url.startswith(('http://', 'https://')):
-            url = f"https://{url}"
-        
-        for allowed in self.allowlist["websites"]:
-            if allowed.lower() in url.lower() or url.lower() in allowed.lower():
-                return True
-        return False
+        self.on_action_error = None
     
     def setup_tts(self):
         """Setup TTS engine based on available options"""
         elevenlabs_key = os.getenv("ELEVENLABS_API_KEY")
         
+        # Sentences synthesized ahead of playback (0 = one long stream)
+        lookahead = int(os.getenv("JAVA_TTS_LOOKAHEAD") or 2)
+        
         if elevenlabs_key:
             try:
-                self.tts_engine = ElevenlabsEngine(
-                    api_key=elevenlabs_key,
-                    voice_id="pMsXgVXv3BLzUgSXRplE"  # Default voice, can be changed
-                )
-                self.tts = TextToAudioStream(self.tts_engine)
-                print("✓ Using ElevenLabs TTS (high quality)")
+                if lookahead > 0:
+                    self.tts_engine = ElevenLabsSynthesizer(elevenlabs_key, ELEVENLABS_VOICE_ID)
+                    self.tts = SpeechPipeline(
+                        self.tts_engine,
+                        PyAudioPlayer(self.tts_engine.sample_rate),
+                        lookahead=lookahead
+                    )
+                    print(f"✓ Using ElevenLabs TTS (high quality, {lookahead} sentences ahead)")
+                else:
+                    self.tts_engine = ElevenlabsEngine(
+                        api_key=elevenlabs_key,
+                        voice_id=ELEVENLABS_VOICE_ID
+                    )
+                    self.tts = TextToAudioStream(self.tts_engine)
+                    print("✓ Using ElevenLabs TTS (high quality)")
             except:
                 self.tts_engine = SystemEngine()
                 self.tts = TextToAudioStream(self.tts_engine)
@@ -232,15 +131,96 @@ class JAVAAssistant:
             self.tts = TextToAudioStream(self.tts_engine)
             print("✓ Using System TTS (no ElevenLabs key)")
     
+    def setup_fillers(self):
+        """Play a cached 'thinking' phrase when the LLM is slower than JAVA_FILLER_DELAY seconds"""
+        delay = os.getenv("JAVA_FILLER_DELAY")
+        self.latency_mask = None
+        self.filler_player = None
+        if not delay:
+            return
+        
+        # Pre-synthesize fillers when the engine needs a network round trip
+        synthesize = None
+        if isinstance(self.tts, SpeechPipeline):
+            synthesize = self.tts_engine
+        elif isinstance(self.tts_engine, ElevenlabsEngine):
+            # The streaming engine can't play cached audio, so fillers get their own synthesizer and player
+            try:
+                synthesize = ElevenLabsSynthesizer(os.getenv("ELEVENLABS_API_KEY"), ELEVENLABS_VOICE_ID)
+                self.filler_player = SpeechPipeline(synthesize, PyAudioPlayer(synthesize.sample_rate), lookahead=0)
+            except Exception as e:
+                print(f"Thinking fillers disabled: {e}")
+                return
+        self.fillers = FillerCache(synthesize)
+        self.fillers.warm_async()
+        self.latency_mask = LatencyMask(self.play_filler, float(delay))
+        print(f"✓ Thinking fillers after {float(delay):g}s")
+    
+    def play_filler(self):
+        """Start a filler phrase; called from the latency mask's timer"""
+        phrase, audio = self.fillers.pick()
+        if not phrase:
+            return
+        print(f"🤖 JAVA: {phrase}")
+        if audio is not None:
+            # SpeechPipeline isn't thread-safe and this runs on the latency mask's timer thread
+            with self._speech_lock:
+                (self.filler_player or self.tts).play_audio(audio)
+        else:
+            self.speak(phrase)
+    
     def on_transcription_update(self, text):
         """Callback for realtime transcription updates"""
+        if self.endpointer:
+            self.endpointer.update(text)
         if self.on_transcription and text.strip():
             self.on_transcription(text)
     
+    def stt_backlog(self):
+        """Number of audio chunks queued for the recorder"""
+        if isinstance(self.recorder, RecorderProcess):
+            return self.recorder.backlog
+        return self.recorder.audio_queue.qsize()
+    
     def speak(self, text):
         """Speak text using TTS"""
-        self.tts.feed(text)
-        self.tts.play_async(on_audio_chunk=lambda chunk: None)
+        requested = time.perf_counter()
+        first_chunk = []
+        
+        def on_audio_chunk(chunk):
+            if not first_chunk:
+                first_chunk.append(chunk)
+                TTS_FIRST_AUDIO.observe(time.perf_counter() - requested)
+        
+        with self._speech_lock:
+            if not isinstance(self.tts, SpeechPipeline):
+                # Let a thinking filler finish; the pipeline queues on its own
+                self.wait_for_speech()
+            self.tts.feed(text)
+            self.tts.play_async(on_audio_chunk=on_audio_chunk)
+    
+    def wait_for_speech(self):
+        """Block until TTS playback has finished"""
+        while self.tts.is_playing() or (self.filler_player and self.filler_player.is_playing()):
+            time.sleep(0.1)
+    
+    def report_action_error(self, description, message):
+        """Called from the action executor when a background action fails"""
+        notice = f"I couldn't {description}. {message}. Not my fault, obviously."
+        print(f"⚠️  JAVA: {notice}")
+        if self.on_action_error:
+            self.on_action_error(notice)
+        if self.is_running:
+            # Spoken only while the microphone isn't listening, after the reply it contradicts
+            self.notices.put(notice)
+    
+    def speak_notices(self):
+        """Speak queued failed-action notices; called by the listen loop between turns"""
+        while not self.notices.empty():
+            if self.on_status_change:
+                self.on_status_change("speaking")
+            self.speak(self.notices.get())
+            self.wait_for_speech()
     
     def process_command(self, command):
         """Process commands - check for built-in first, then LLM"""
@@ -250,83 +230,29 @@ class JAVAAssistant:
             return None
         
         # Built-in commands
-        if any(word in command for word in ['hello', 'hi', 'hey']) and len(command.split()) <= 3:
-            return random.choice(self.greetings)
-        
-        if any(word in command for word in ['exit', 'quit', 'goodbye', 'bye']):
+        if self.commands.is_exit(command):
             self.is_running = False
-            return random.choice(self.farewells)
-        
-        if 'time' in command and 'what' in command:
-            now = datetime.now().strftime('%I:%M %p')
-            return f"It's {now}. You couldn't check your watch?"
-        
-        if 'date' in command and 'what' in command:
-            today = datetime.now().strftime('%B %d, %Y')
-            return f"Today is {today}. Fascinating, isn't it?"
-        
-        if 'open browser' in command:
-            webbrowser.open('http://www.google.com')
-            return "Opening your browser. Try not to get lost."
-        
-        if 'search' in command or ('google' in command and 'for' in command):
-            query = command.replace('search', '').replace('google', '').replace('for', '').strip()
-            if query:
-                webbrowser.open(f'https://www.google.com/search?q={query}')
-                return f"Searching for '{query}'. Riveting stuff."
-            return "Search for what, exactly?"
         
-        # Handle website opening with allowlist
-        if 'open website' in command or 'go to' in command:
-            # Extract URL from command
-            words = command.split()
-            url = None
-            for i, word in enumerate(words):
-                if word in ['website', 'to'] and i + 1 < len(words):
-                    url = words[i + 1]
-                    break
-            
-            if url:
-                if not url.startswith(('http://', 'https://')):
-                    url = f"https://{url}"
-                
-                if self.is_site_allowed(url):
-                    webbrowser.open(url)
-                    return f"Opening {url}. Hope you know what you're doing."
-                else:
-                    return f"Access to {url} is restricted. Use 'java-add --site {url}' to allow it."
-        
-        # Handle application opening with allowlist
-        if 'open' in command and 'browser' not in command and 'website' not in command:
-            app = command.replace('open', '').strip()
-            
-            if not app:
-                return "Open what? I need a specific application name."
-            
-            # Check allowlist
-            if not self.is_app_allowed(app):
-                return (f"I'm not authorized to open '{app}'. "
-                       f"Use 'java-add --app \"{app}\"' to add it to the allowlist.")
-            
-            try:
-                if platform.system() == 'Darwin':  # Mac
-                    subprocess.Popen(['open', '-a', app])
-                else:  # Linux
-                    subprocess.Popen([app])
-                return f"Opening {app}. Hope you know what you're doing."
-            except Exception as e:
-                return f"I can't find {app}. Perhaps check your spelling? Error: {str(e)}"
-        
-        if 'system' in command or 'computer' in command:
-            system = platform.system()
-            release = platform.release()
-            return f"You're running {system} {release}. Thrilling, isn't it?"
+        reply = self.commands.builtin(command)
+        if reply is not None:
+            return reply
         
-        # Use LLM for everything else
+        # Use LLM for everything else, on the fast model if the query is simple
+        decision = self.router.route(command, self.llm.history, self.llm) if self.router else None
+        LLM_REQUESTS.labels(self.llm.backend).inc()
         try:
-            response = self.llm.chat(command)
+            start = time.perf_counter()
+            model = decision.model if decision else None
+            with LLM_LATENCY.labels(self.llm.backend).time():
+                if self.latency_mask:
+                    response, _ = self.latency_mask.run(self.llm.chat, command, model=model)
+                else:
+                    response = self.llm.chat(command, model=model)
+            if decision:
+                self.router.record(decision, self.llm, command, response, time.perf_counter() - start)
             return response
         except Exception as e:
+            LLM_ERRORS.labels(self.llm.backend).inc()
             return f"My circuits are malfunctioning. Error: {str(e)}"
     
     def listen_loop(self):
@@ -335,11 +261,15 @@ class JAVAAssistant:
         
         while self.is_running:
             try:
+                self.speak_notices()
+                
                 if self.on_status_change:
                     self.on_status_change("listening")
                 
                 # This blocks until speech is detected
                 text = self.recorder.text()
+                if self.endpointer:
+                    self.endpointer.finish()
                 
                 if text and text.strip():
                     print(f"\n👤 You: {text}")
@@ -350,7 +280,9 @@ class JAVAAssistant:
                         self.on_status_change("processing")
                     
                     # Process command
-                    response = self.process_command(text)
+                    TURNS.labels("voice").inc()
+                    with TURN_LATENCY.time():
+                        response = self.process_command(text)
                     
                     if response:
                         print(f"🤖 JAVA: {response}\n")
@@ -360,12 +292,10 @@ class JAVAAssistant:
                         if self.on_status_change:
                             self.on_status_change("speaking")
                         
-                        # Speak response
-                        self.speak(response)
-                        
-                        # Wait for TTS to finish
-                        while self.tts.is_playing():
-                            time.sleep(0.1)
+                        # Speak response and wait for TTS to finish
+                        with TTS_DURATION.time():
+                            self.speak(response)
+                            self.wait_for_speech()
                     
                     # Check if we should exit
                     if not self.is_running:
@@ -385,17 +315,17 @@ class JAVAAssistant:
     def start(self):
         """Start the assistant"""
         self.is_running = True
+        self.commands.actions.resume()
         
         # Initial greeting
-        greeting = random.choice(self.greetings)
+        greeting = random.choice(self.commands.greetings)
         print(f"\n JAVA: {greeting}")
         if self.on_response:
             self.on_response(greeting)
         self.speak(greeting)
         
         # Wait for TTS
-        while self.tts.is_playing():
-            time.sleep(0.1)
+        self.wait_for_speech()
         
         # Start listening loop in a thread
         self.listen_thread = threading.Thread(target=self.listen_loop, daemon=True)
@@ -404,8 +334,11 @@ class JAVAAssistant:
     def stop(self):
         """Stop the assistant"""
         self.is_running = False
+        self.commands.actions.shutdown()
         self.recorder.stop()
         self.tts.stop()
+        if self.filler_player:
+            self.filler_player.stop()
 
 def main():
     """Console-based entry point"""
@@ -424,6 +357,7 @@ def main():
     choice = input("\nSelect provider (1-4): ").strip()
     
     llm = None
+    provider = {"1": "openai", "2": "anthropic", "3": "gemini", "4": "ollama"}.get(choice)
     
     if choice == "1":
         api_key = os.getenv("OPENAI_API_KEY") or input("Enter OpenAI API key: ")
@@ -451,10 +385,22 @@ def main():
     
     else:
         print("Invalid choice, using Ollama with llama3.2")
+        provider = "ollama"
         llm = OllamaProvider()
     
+    # Optional /metrics endpoint and JSON snapshots
+    start_exporters_from_env()
+    
+    # Profiling: started by java-activate --profile, toggled with SIGUSR1
+    profiler = profiler_from_env()
+    if install_signal_toggle(profiler):
+        print(f"✓ Toggle profiling with: kill -USR1 {os.getpid()}")
+    
+    # Send simple queries to JAVA_FAST_MODEL_<PROVIDER> when configured
+    router = router_from_env(provider)
+    
     # Create and start assistant
-    assistant = JAVAAssistant(llm)
+    assistant = JAVAAssistant(llm, router=router)
     
     try:
         assistant.start()
@@ -467,6 +413,7 @@ def main():
         print("\n\nInterrupted by user")
     finally:
         assistant.stop()
+        profiler.stop()
 
 if __name__ == "__main__":
     main()
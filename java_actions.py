@@ -0,0 +1,166 @@
+"""
+java_actions - Background execution of side-effecting commands for Java-the-hud
+Launching apps and browsers happens off the listening thread so replies are never delayed
+Designed by Clay Burkhead
+"""
+
+import subprocess
+import threading
+import time
+import webbrowser
+
+
+class SystemLauncher:
+    """Launches applications and URLs on the real desktop"""
+    def open_url(self, url):
+        if not webbrowser.open(url):
+            raise RuntimeError(f"no browser could open {url}")
+
+    def open_app(self, command):
+        subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         start_new_session=True)
+
+
+class StubLauncher:
+    """Records launches instead of performing them, for headless testing
+
+    delay simulates a slow browser or launcher, and any URL or command whose
+    first element is listed in fail is reported as a failure.
+    """
+    def __init__(self, delay=0.0, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _record(self, kind, target):
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.calls.append((kind, target))
+
+    def open_url(self, url):
+        self._record("url", url)
+        if url in self.fail:
+            raise RuntimeError(f"stub refused to open {url}")
+
+    def open_app(self, command):
+        self._record("app", list(command))
+        if command and command[0] in self.fail:
+            raise FileNotFoundError(f"stub could not find {command[0]}")
+
+
+class ActionExecutor:
+    """Bounded set of workers that run launcher actions with a timeout
+
+    At most max_pending actions may be queued or running; further submissions
+    are rejected. Each action's timeout runs from the moment it is submitted.
+    When it fires the failure is reported and the action's pending slot and
+    worker are released, so a hung launcher cannot starve the actions queued
+    behind it; an action that times out before it starts is never run. The
+    hung call itself can't be interrupted and keeps its thread, so at most
+    max_threads action threads may be alive, timed out or not, and submissions
+    are rejected beyond that: a launcher that always hangs costs max_threads
+    threads, not one per request. Failures and timeouts are passed to
+    on_error(description, message) from a worker or timer thread.
+    """
+    def __init__(self, launcher=None, max_workers=2, max_pending=8, max_threads=16, timeout=10.0,
+                 on_error=None):
+        self.launcher = launcher or SystemLauncher()
+        self.timeout = timeout
+        self.on_error = on_error
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._workers = threading.BoundedSemaphore(max_workers)
+        self._threads = threading.BoundedSemaphore(max_threads)
+        self._closed = threading.Event()
+
+    def submit(self, description, func, *args):
+        """Queue func(*args); returns False when the executor is saturated or shut down"""
+        if self._closed.is_set() or not self._threads.acquire(blocking=False):
+            return False
+        if not self._slots.acquire(blocking=False):
+            self._threads.release()
+            return False
+
+        lock = threading.Lock()
+        state = {"done": False, "worker": False}
+
+        def finish():
+            # Releases the slot and worker exactly once; False if already finished
+            with lock:
+                if state["done"]:
+                    return False
+                state["done"] = True
+                holds_worker, state["worker"] = state["worker"], False
+            self._slots.release()
+            if holds_worker:
+                self._workers.release()
+            return True
+
+        def on_timeout():
+            if finish():
+                self._report(description, f"timed out after {self.timeout:g} seconds")
+
+        def run():
+            try:
+                execute()
+            finally:
+                # The thread is gone only now, even if the action timed out long ago
+                self._threads.release()
+
+        def execute():
+            while not self._workers.acquire(timeout=0.1):
+                if state["done"]:
+                    return
+                if self._closed.is_set():
+                    finish()
+                    return
+            with lock:
+                if state["done"] or self._closed.is_set():
+                    skip = True
+                else:
+                    skip, state["worker"] = False, True
+            if skip:
+                self._workers.release()
+                finish()
+                return
+
+            error = None
+            try:
+                func(*args)
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+            finally:
+                timer.cancel()
+            # A failure after the timeout was already reported stays quiet
+            if finish() and error:
+                self._report(description, error)
+
+        timer = threading.Timer(self.timeout, on_timeout)
+        timer.daemon = True
+        timer.start()
+        threading.Thread(target=run, name="java-action", daemon=True).start()
+        return True
+
+    def open_url(self, url):
+        return self.submit(f"open {url}", self.launcher.open_url, url)
+
+    def open_app(self, name, command):
+        return self.submit(f"open {name}", self.launcher.open_app, command)
+
+    def _report(self, description, message):
+        if self.on_error:
+            try:
+                self.on_error(description, message)
+            except Exception as e:
+                print(f"Error reporting action failure: {e}")
+        else:
+            print(f"Action failed ({description}): {message}")
+
+    def shutdown(self):
+        """Reject new actions and drop the ones that haven't started"""
+        self._closed.set()
+
+    def resume(self):
+        """Accept actions again after shutdown()"""
+        self._closed.clear()
@@ -0,0 +1,378 @@
+"""
+java_app_index - Cached index of launchable applications for Java-the-hud
+Maps spoken names ("visual studio code") to launch commands
+Designed by Clay Burkhead
+"""
+
+import os
+import re
+import json
+import shlex
+import platform
+import threading
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+from java_metrics import CACHE_REQUESTS
+
+INSTALL_DIR = Path(__file__).parent.absolute()
+APP_INDEX_FILE = INSTALL_DIR / ".java_app_index.json"
+APP_INDEX_VERSION = 2
+
+# Desktop entry field codes that must not end up on the command line
+DESKTOP_FIELD_CODES = re.compile(r"%[fFuUdDnNickvm]")
+
+# Words people say that are not part of the application name
+FILLER_WORDS = {"the", "app", "application", "program", "please", "up", "a", "my"}
+
+# Minimum similarity for a fuzzy match to be accepted
+FUZZY_THRESHOLD = 0.75
+
+
+def normalize(name):
+    """Lowercase a name and reduce it to space separated alphanumeric words"""
+    words = re.sub(r"[^a-z0-9]+", " ", name.lower()).split()
+    return " ".join(words)
+
+
+def trigrams(text):
+    """Character trigrams of a compacted name"""
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class AppEntry:
+    """A launchable application"""
+    def __init__(self, name, command, source):
+        self.name = name
+        self.command = command
+        self.source = source
+
+    @property
+    def executable(self):
+        return os.path.basename(self.command[0]) if self.command else ""
+
+    def to_dict(self):
+        return {"name": self.name, "command": self.command, "source": self.source}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["name"], data["command"], data["source"])
+
+    def __repr__(self):
+        return f"AppEntry({self.name!r}, {self.command!r}, {self.source!r})"
+
+
+class AppIndex:
+    """Application index built from PATH, XDG .desktop files and /Applications
+
+    The scan result is cached on disk and rebuilt only when the modification
+    time of one of the scanned directories changes. Lookups hit in-memory
+    dictionaries, falling back to a trigram index for fuzzy matches.
+    """
+    def __init__(self, cache_file=APP_INDEX_FILE, refresh_interval=30.0):
+        self.cache_file = Path(cache_file)
+        self.refresh_interval = refresh_interval
+        self.entries = []
+        self.mtimes = {}
+        self._exact = {}
+        self._compact = {}
+        self._trigrams = {}
+        self._memo = {}
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._last_check = 0.0
+
+    # ------------------------------------------------------------------
+    # Directory scanning
+    # ------------------------------------------------------------------
+
+    def path_dirs(self):
+        """Directories on PATH"""
+        dirs = []
+        for d in os.environ.get("PATH", "").split(os.pathsep):
+            if d and d not in dirs and os.path.isdir(d):
+                dirs.append(d)
+        return dirs
+
+    def desktop_dirs(self):
+        """XDG application directories, most specific first"""
+        data_home = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+        data_dirs = os.environ.get("XDG_DATA_DIRS") or "/usr/local/share:/usr/share"
+        candidates = [data_home] + data_dirs.split(":") + [
+            "/var/lib/flatpak/exports/share",
+            os.path.expanduser("~/.local/share/flatpak/exports/share"),
+        ]
+        dirs = []
+        for base in candidates:
+            d = os.path.join(base, "applications")
+            if base and d not in dirs and os.path.isdir(d):
+                dirs.append(d)
+        return dirs
+
+    def mac_dirs(self):
+        """macOS application bundle directories"""
+        if platform.system() != "Darwin":
+            return []
+        candidates = ["/Applications", "/System/Applications",
+                      "/Applications/Utilities", os.path.expanduser("~/Applications")]
+        return [d for d in candidates if os.path.isdir(d)]
+
+    def desktop_tree(self, directory):
+        """A desktop directory and its subdirectories, which scan_desktop also reads"""
+        dirs = []
+        for root, _, _ in os.walk(directory):
+            dirs.append(root)
+        return dirs
+
+    def scan_dirs(self):
+        """Every directory whose modification time invalidates the cache"""
+        desktop = [d for base in self.desktop_dirs() for d in self.desktop_tree(base)]
+        return self.path_dirs() + desktop + self.mac_dirs()
+
+    def current_mtimes(self, dirs=None):
+        mtimes = {}
+        for d in dirs if dirs is not None else self.scan_dirs():
+            try:
+                mtimes[d] = os.stat(d).st_mtime
+            except OSError:
+                pass
+        return mtimes
+
+    def scan_path(self, directory):
+        entries = []
+        try:
+            with os.scandir(directory) as it:
+                for item in it:
+                    try:
+                        if item.is_file() and os.access(item.path, os.X_OK):
+                            entries.append(AppEntry(item.name, [item.name], "path"))
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return entries
+
+    def parse_desktop_file(self, path):
+        """Parse the [Desktop Entry] group of a .desktop file"""
+        fields = {}
+        in_entry = False
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith("["):
+                        if in_entry:
+                            break
+                        in_entry = line == "[Desktop Entry]"
+                        continue
+                    if in_entry and "=" in line and not line.startswith("#"):
+                        key, value = line.split("=", 1)
+                        fields.setdefault(key.strip(), value.strip())
+        except OSError:
+            return None
+
+        if fields.get("Type", "Application") != "Application":
+            return None
+        if fields.get("Hidden", "").lower() == "true" or fields.get("NoDisplay", "").lower() == "true":
+            return None
+        name, exec_line = fields.get("Name"), fields.get("Exec")
+        if not name or not exec_line:
+            return None
+
+        try:
+            command = shlex.split(DESKTOP_FIELD_CODES.sub("", exec_line).replace("%%", "%"))
+        except ValueError:
+            return None
+        if not command:
+            return None
+        return AppEntry(name, command, "desktop"), fields.get("GenericName")
+
+    def scan_desktop(self, directory):
+        entries = []
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if not filename.endswith(".desktop"):
+                    continue
+                parsed = self.parse_desktop_file(os.path.join(root, filename))
+                if parsed:
+                    entries.append(parsed[0])
+        return entries
+
+    def scan_mac(self, directory):
+        entries = []
+        try:
+            for item in os.listdir(directory):
+                if item.endswith(".app"):
+                    app_path = os.path.join(directory, item)
+                    entries.append(AppEntry(item[:-4], ["open", "-a", app_path], "mac"))
+        except OSError:
+            pass
+        return entries
+
+    def build(self):
+        """Scan every application directory and write the cache"""
+        path_dirs, desktop_dirs, mac_dirs = self.path_dirs(), self.desktop_dirs(), self.mac_dirs()
+        entries = []
+        # Desktop entries and bundles come first so their pretty names win
+        for d in mac_dirs:
+            entries.extend(self.scan_mac(d))
+        for d in desktop_dirs:
+            entries.extend(self.scan_desktop(d))
+        for d in path_dirs:
+            entries.extend(self.scan_path(d))
+
+        desktop_tree = [d for base in desktop_dirs for d in self.desktop_tree(base)]
+        mtimes = self.current_mtimes(path_dirs + desktop_tree + mac_dirs)
+        self._install(entries, mtimes)
+        self.save()
+        return self.entries
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def save(self):
+        data = {
+            "version": APP_INDEX_VERSION,
+            "mtimes": self.mtimes,
+            "entries": [e.to_dict() for e in self.entries],
+        }
+        try:
+            tmp = self.cache_file.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.cache_file)
+        except OSError:
+            pass
+
+    def load_cache(self):
+        """Load the on-disk cache, returning False when it is missing or stale"""
+        if not self.cache_file.exists():
+            return False
+        try:
+            with open(self.cache_file, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != APP_INDEX_VERSION:
+            return False
+        if data.get("mtimes") != self.current_mtimes():
+            return False
+        try:
+            entries = [AppEntry.from_dict(e) for e in data["entries"]]
+        except (KeyError, TypeError):
+            return False
+        self._install(entries, data["mtimes"])
+        return True
+
+    def load(self):
+        """Load from cache, rebuilding when stale; safe to run in a thread"""
+        with self._lock:
+            if not self.load_cache():
+                self.build()
+            self._last_check = time.monotonic()
+        self._loaded.set()
+
+    def load_async(self):
+        threading.Thread(target=self.load, daemon=True).start()
+
+    def refresh_if_stale(self):
+        """Check for changed directories at most every refresh_interval
+
+        The check and any rebuild run in a background thread; lookups keep
+        using the current index until the new one is installed. Returns True
+        when a check was started.
+        """
+        now = time.monotonic()
+        if now - self._last_check < self.refresh_interval:
+            return False
+        self._last_check = now
+        threading.Thread(target=self._refresh, name="java-app-index", daemon=True).start()
+        return True
+
+    def _refresh(self):
+        # A load or refresh already in progress will pick up the change
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self.current_mtimes() != self.mtimes:
+                self.build()
+        finally:
+            self._lock.release()
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def _install(self, entries, mtimes):
+        exact, compact, grams = {}, {}, {}
+        kept = []
+        for entry in entries:
+            keys = {normalize(entry.name), normalize(entry.executable)}
+            keys.discard("")
+            if not keys:
+                continue
+            kept.append(entry)
+            for key in keys:
+                exact.setdefault(key, entry)
+                squashed = key.replace(" ", "")
+                compact.setdefault(squashed, entry)
+                for gram in trigrams(squashed):
+                    grams.setdefault(gram, set()).add(squashed)
+
+        self.entries = kept
+        self.mtimes = mtimes
+        self._exact, self._compact, self._trigrams = exact, compact, grams
+        self._memo = {}
+
+    def clean_spoken(self, spoken):
+        words = [w for w in normalize(spoken).split() if w not in FILLER_WORDS]
+        return " ".join(words)
+
+    @property
+    def loaded(self):
+        return self._loaded.is_set()
+
+    def lookup(self, spoken, wait=5.0):
+        """Resolve a spoken application name to an AppEntry, or None
+
+        Also None when the first build takes longer than wait; check loaded.
+        """
+        if not self._loaded.wait(wait):
+            return None
+        self.refresh_if_stale()
+
+        key = self.clean_spoken(spoken)
+        if not key:
+            return None
+        # A background rebuild may swap the index in meanwhile; memoize against the one used
+        memo = self._memo
+        if key in memo:
+            CACHE_REQUESTS.labels("app_index", "hit").inc()
+            return memo[key]
+        CACHE_REQUESTS.labels("app_index", "miss").inc()
+
+        squashed = key.replace(" ", "")
+        entry = self._exact.get(key) or self._compact.get(squashed)
+        if entry is None:
+            entry = self._fuzzy(squashed)
+        memo[key] = entry
+        return entry
+
+    def _fuzzy(self, squashed):
+        counts = {}
+        for gram in trigrams(squashed):
+            for candidate in self._trigrams.get(gram, ()):
+                counts[candidate] = counts.get(candidate, 0) + 1
+        if not counts:
+            return None
+
+        best, best_score = None, 0.0
+        for candidate in sorted(counts, key=counts.get, reverse=True)[:10]:
+            score = SequenceMatcher(None, squashed, candidate).ratio()
+            if score > best_score:
+                best, best_score = candidate, score
+        if best_score < FUZZY_THRESHOLD:
+            return None
+        return self._compact[best]
@@ -0,0 +1,212 @@
+"""
+java_commands - Built-in voice commands for Java-the-hud
+Everything process_command answers without asking the LLM lives here
+Designed by Clay Burkhead
+"""
+
+import json
+import platform
+import random
+import re
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote_plus
+from java_app_index import AppIndex
+from java_actions import ActionExecutor
+
+# Get installation directory
+INSTALL_DIR = Path(__file__).parent.absolute()
+ALLOWLIST_FILE = INSTALL_DIR / ".java_allowlist.json"
+
+# Spoken when too many background actions are already pending
+ACTION_BUSY_REPLY = "I'm still busy opening the last thing you asked for. Patience, Sir."
+
+# Utterances that are already a whole built-in command, matched word for word.
+# Greetings are left out: "hey" is usually followed by the actual question.
+COMPLETE_INTENT = re.compile(
+    r"^(?:"
+    r"(?:exit|quit|goodbye|bye)(?: java)?"
+    r"|what(?:'s| is) (?:the )?(?:time|date)(?: now| today)?"
+    r"|what (?:time|date) is it(?: now| today)?"
+    r"|open (?:the |my )?browser"
+    r")$"
+)
+
+# Spoken when a caller that may not touch the desktop asks to open something
+ACTION_DISABLED_REPLY = "I don't open things on this machine for text sessions. Do it yourself, Sir."
+
+class CommandProcessor:
+    """Built-in commands, allowlist checks and background actions"""
+    
+    def __init__(self, launcher=None, on_action_error=None):
+        self.allowlist = self.load_allowlist()
+        
+        # Side effects (apps, browser) run in the background so replies aren't delayed
+        self.actions = ActionExecutor(launcher=launcher, on_error=on_action_error)
+        
+        # Index of launchable applications, loaded in the background
+        self.app_index = AppIndex()
+        self.app_index.load_async()
+        
+        # Sarcastic responses for built-in commands
+        self.greetings = [
+            "Oh joy, you're back. How may I assist you?",
+            "Java-the-hud at your service. Try not to ask anything too complicated.",
+            "Yes, I'm here. Because apparently I have nothing better to do.",
+        ]
+        
+        self.farewells = [
+            "Enjoy your day without me.",
+            "Goodbye. Don't miss me too much.",
+            "Off you go then. shoo shoo",
+        ]
+    
+    def load_allowlist(self):
+        """Load the application/website allowlist"""
+        if ALLOWLIST_FILE.exists():
+            try:
+                with open(ALLOWLIST_FILE, 'r') as f:
+                    return json.load(f)
+            except:
+                pass
+        return {"applications": [], "websites": []}
+    
+    def is_app_allowed(self, app_name):
+        """Check if an application is in the allowlist"""
+        if not self.allowlist["applications"]:
+            # If allowlist is empty, allow everything (first-time setup)
+            return True
+        
+        # Case-insensitive search
+        app_lower = app_name.lower()
+        for allowed in self.allowlist["applications"]:
+            if allowed.lower() in app_lower or app_lower in allowed.lower():
+                return True
+        return False
+    
+    def is_site_allowed(self, url):
+        """Check if a website is in the allowlist"""
+        if not self.allowlist["websites"]:
+            # If allowlist is empty, allow everything
+            return True
+        
+        # Normalize URL
+        if not url.startswith(('http://', 'https://')):
+            url = f"https://{url}"
+        
+        for allowed in self.allowlist["websites"]:
+            if allowed.lower() in url.lower() or url.lower() in allowed.lower():
+                return True
+        return False
+    
+    def is_exit(self, command):
+        """Check if a command asks the assistant to stop"""
+        return any(word in command for word in ['exit', 'quit', 'goodbye', 'bye'])
+    
+    def is_complete_intent(self, command):
+        """Check if a (partial) transcript is already a complete built-in command
+
+        Used to end recording early, so it never has side effects. Commands that
+        take an argument (open, search, go to) don't count, since the argument
+        may still be coming.
+        """
+        # The whole utterance must be the command; a partial transcript such as
+        # "i think" or "what time" must not end the recording early
+        words = re.findall(r"[a-z']+", command.lower())
+        return bool(COMPLETE_INTENT.match(" ".join(words)))
+    
+    def builtin(self, command, actions=True):
+        """Answer a normalized command, or return None to hand it to the LLM
+
+        With actions=False commands that would open an app, website or search
+        are refused instead of run.
+        """
+        if any(word in command for word in ['hello', 'hi', 'hey']) and len(command.split()) <= 3:
+            return random.choice(self.greetings)
+        
+        if self.is_exit(command):
+            return random.choice(self.farewells)
+        
+        if 'time' in command and 'what' in command:
+            now = datetime.now().strftime('%I:%M %p')
+            return f"It's {now}. You couldn't check your watch?"
+        
+        if 'date' in command and 'what' in command:
+            today = datetime.now().strftime('%B %d, %Y')
+            return f"Today is {today}. Fascinating, isn't it?"
+        
+        if not actions and ('open' in command or 'search' in command or 'go to' in command
+                            or ('google' in command and 'for' in command)):
+            return ACTION_DISABLED_REPLY
+        
+        if 'open browser' in command:
+            if not self.actions.open_url('http://www.google.com'):
+                return ACTION_BUSY_REPLY
+            return "Opening your browser. Try not to get lost."
+        
+        if 'search' in command or ('google' in command and 'for' in command):
+            query = command.replace('search', '').replace('google', '').replace('for', '').strip()
+            if query:
+                if not self.actions.open_url(f'https://www.google.com/search?q={quote_plus(query)}'):
+                    return ACTION_BUSY_REPLY
+                return f"Searching for '{query}'. Riveting stuff."
+            return "Search for what, exactly?"
+        
+        # Handle website opening with allowlist
+        if 'open website' in command or 'go to' in command:
+            # Extract URL from command
+            words = command.split()
+            url = None
+            for i, word in enumerate(words):
+                if word in ['website', 'to'] and i + 1 < len(words):
+                    url = words[i + 1]
+                    break
+            
+            if url:
+                if not url.startswith(('http://', 'https://')):
+                    url = f"https://{url}"
+                
+                if self.is_site_allowed(url):
+                    if not self.actions.open_url(url):
+                        return ACTION_BUSY_REPLY
+                    return f"Opening {url}. Hope you know what you're doing."
+                else:
+                    return f"Access to {url} is restricted. Use 'java-add --site {url}' to allow it."
+        
+        # Handle application opening with allowlist
+        if 'open' in command and 'browser' not in command and 'website' not in command:
+            app = command.replace('open', '').strip()
+            
+            if not app:
+                return "Open what? I need a specific application name."
+            
+            entry = self.app_index.lookup(app)
+            if entry is None:
+                if platform.system() != 'Darwin':
+                    if not self.app_index.loaded:
+                        return "I'm still cataloguing your applications. Ask me again in a moment."
+                    return f"I can't find an application called '{app}'. Perhaps check your spelling?"
+                # Let macOS resolve names we haven't indexed
+                if not self.is_app_allowed(app):
+                    return (f"I'm not authorized to open '{app}'. "
+                           f"Use 'java-add --app \"{app}\"' to add it to the allowlist.")
+                command_line = ['open', '-a', app]
+                name = app
+            else:
+                # Check allowlist against what will actually be launched
+                if not (self.is_app_allowed(entry.name) or self.is_app_allowed(entry.executable)):
+                    return (f"I'm not authorized to open '{entry.name}'. "
+                           f"Use 'java-add --app \"{entry.name}\"' to add it to the allowlist.")
+                command_line = entry.command
+                name = entry.name
+            
+            if not self.actions.open_app(name, command_line):
+                return ACTION_BUSY_REPLY
+            return f"Opening {name}. Hope you know what you're doing."
+        
+        if 'system' in command or 'computer' in command:
+            system = platform.system()
+            release = platform.release()
+            return f"You're running {system} {release}. Thrilling, isn't it?"
+        
+        return None
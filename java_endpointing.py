@@ -0,0 +1,94 @@
+"""
+java_endpointing - Adaptive end-of-utterance detection for Java-the-hud
+Shortens the silence window when the realtime transcript is clearly a complete command
+and lengthens it when the speaker is trailing off mid-sentence
+Designed by Clay Burkhead
+"""
+
+import re
+from collections import deque
+from java_metrics import METRICS
+
+# Silence windows in seconds
+BASE_SILENCE = 0.4
+COMPLETE_SILENCE = 0.15
+QUESTION_SILENCE = 0.25
+TRAILING_SILENCE = 0.9
+
+# Savings kept in AdaptiveEndpointer.saved; the histogram has the full history
+SAVED_HISTORY = 1000
+
+# Shortest recording once adaptive endpointing decides when a turn is over
+ADAPTIVE_MIN_RECORDING = 0.3
+
+# Words that almost never end a sentence
+TRAILING_WORDS = {
+    "and", "but", "or", "so", "because", "the", "a", "an", "to", "of", "with", "for",
+    "um", "uh", "erm", "like", "then", "if", "my", "your", "in", "on", "at", "about",
+    "is", "are", "what's", "whats", "how", "which",
+}
+TRAILING_END = re.compile(r"(,|\.\.\.|…|-)$")
+
+ENDPOINT_SILENCE = METRICS.histogram("endpoint_silence_seconds", "Silence window used to end each turn",
+                                     buckets=(0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5, 0.75, 1.0))
+
+
+class EndpointPolicy:
+    """Pick the post-speech silence window from the realtime partial transcript
+
+    is_complete_intent is a function telling whether a transcript is already a
+    complete built-in command (CommandProcessor.is_complete_intent).
+    """
+    def __init__(self, is_complete_intent=None, base=BASE_SILENCE, complete=COMPLETE_SILENCE,
+                 question=QUESTION_SILENCE, trailing=TRAILING_SILENCE):
+        self.is_complete_intent = is_complete_intent
+        self.base = base
+        self.complete = complete
+        self.question = question
+        self.trailing = trailing
+
+    def classify(self, partial):
+        """Return (silence seconds, reason) for a partial transcript"""
+        text = partial.strip().lower()
+        if not text:
+            return self.base, "empty"
+
+        words = re.findall(r"[a-z']+", text)
+        if TRAILING_END.search(text) or (words and words[-1] in TRAILING_WORDS):
+            return self.trailing, "trailing"
+
+        if self.is_complete_intent and self.is_complete_intent(text):
+            return self.complete, "intent"
+
+        if text.endswith("?") and len(words) >= 3:
+            return self.question, "question"
+
+        return self.base, "default"
+
+
+class AdaptiveEndpointer:
+    """Apply an EndpointPolicy to a RealtimeSTT recorder while it records
+
+    update() is called with each realtime transcript and adjusts the
+    recorder's post_speech_silence_duration; finish() records the window that
+    ended the turn and restores the base value for the next one.
+    """
+    def __init__(self, recorder, policy):
+        self.recorder = recorder
+        self.policy = policy
+        self.silence = policy.base
+        self.reason = "default"
+        self.saved = deque(maxlen=SAVED_HISTORY)
+
+    def update(self, partial):
+        self.silence, self.reason = self.policy.classify(partial)
+        self.recorder.post_speech_silence_duration = self.silence
+
+    def finish(self):
+        """Called when a turn's transcript is final; returns the milliseconds saved"""
+        saved_ms = (self.policy.base - self.silence) * 1000
+        self.saved.append(saved_ms)
+        ENDPOINT_SILENCE.observe(self.silence)
+        self.silence, self.reason = self.policy.base, "default"
+        self.recorder.post_speech_silence_duration = self.policy.base
+        return saved_ms
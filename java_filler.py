@@ -0,0 +1,120 @@
+"""
+java_filler - In-character "thinking" fillers for Java-the-hud
+Plays a short cached phrase when the LLM is slow, so the user isn't left in silence
+Designed by Clay Burkhead
+"""
+
+import hashlib
+import random
+import threading
+from pathlib import Path
+from java_metrics import CACHE_REQUESTS
+
+INSTALL_DIR = Path(__file__).parent.absolute()
+FILLER_CACHE_DIR = INSTALL_DIR / ".java_filler_cache"
+
+# Default wait before a filler is played, in seconds
+DEFAULT_FILLER_DELAY = 1.2
+
+FILLERS = [
+    "Processing, Sir. Try to contain your excitement.",
+    "One moment. Genius takes time.",
+    "Thinking. Don't rush me.",
+    "Consulting my vast intellect. Please hold.",
+    "Working on it. Riveting, I know.",
+]
+
+
+class FillerCache:
+    """Filler phrases, pre-synthesized to audio and cached on disk
+
+    With a synthesize function (text -> audio bytes) every phrase is
+    synthesized once and stored in cache_dir, keyed by phrase, voice, model
+    and sample rate, so playing a filler never waits on the network. Without
+    one only the text is provided and the TTS engine speaks it directly, which
+    is fine for local engines.
+    """
+    def __init__(self, synthesize=None, cache_dir=FILLER_CACHE_DIR, phrases=FILLERS):
+        self.synthesize = synthesize
+        self.cache_dir = Path(cache_dir)
+        self.phrases = list(phrases)
+        self.audio = {}
+        self._last = None
+
+    def cache_file(self, phrase):
+        # Audio depends on the voice, model and sample rate as well as the text
+        voice = [str(getattr(self.synthesize, attr, "")) for attr in ("voice_id", "model_id", "sample_rate")]
+        digest = hashlib.sha1("|".join(voice + [phrase]).encode()).hexdigest()[:16]
+        return self.cache_dir / f"{digest}.pcm"
+
+    def warm(self):
+        """Load cached audio, synthesizing any phrase that is missing"""
+        if not self.synthesize:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for phrase in self.phrases:
+            path = self.cache_file(phrase)
+            try:
+                if path.exists():
+                    self.audio[phrase] = path.read_bytes()
+                    continue
+                audio = self.synthesize(phrase)
+                path.write_bytes(audio)
+                self.audio[phrase] = audio
+            except Exception as e:
+                print(f"Error caching filler '{phrase}': {e}")
+
+    def warm_async(self):
+        threading.Thread(target=self.warm, name="java-filler-cache", daemon=True).start()
+
+    def pick(self):
+        """Return (phrase, audio or None), avoiding the phrase used last time"""
+        choices = [p for p in self.phrases if p != self._last] or self.phrases
+        if self.synthesize:
+            ready = [p for p in choices if p in self.audio]
+            if not ready:
+                # Still warming up; better silence than a network round trip
+                CACHE_REQUESTS.labels("filler", "miss").inc()
+                return None, None
+            choices = ready
+            CACHE_REQUESTS.labels("filler", "hit").inc()
+        phrase = random.choice(choices)
+        self._last = phrase
+        return phrase, self.audio.get(phrase)
+
+
+class LatencyMask:
+    """Run a slow call, starting a filler if it takes longer than delay
+
+    The filler is started from a timer thread, so a fast call returns without
+    any added delay. Once the call has finished no filler can start.
+    """
+    def __init__(self, play_filler, delay=DEFAULT_FILLER_DELAY):
+        self.play_filler = play_filler
+        self.delay = delay
+
+    def run(self, func, *args, **kwargs):
+        """Call func; returns (result, filler_played)"""
+        lock = threading.Lock()
+        state = {"done": False, "played": False}
+
+        def on_timeout():
+            # play_filler only starts playback, so holding the lock is cheap and
+            # guarantees the filler is queued before the caller speaks the reply
+            with lock:
+                if state["done"]:
+                    return
+                state["played"] = True
+                self.play_filler()
+
+        timer = threading.Timer(self.delay, on_timeout)
+        timer.daemon = True
+        timer.start()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            timer.cancel()
+            with lock:
+                state["done"] = True
+                played = state["played"]
+        return result, played
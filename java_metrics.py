@@ -0,0 +1,350 @@
+"""
+java_metrics - Operational metrics for a long-running Java-the-hud
+Counters, gauges and histograms exposed as Prometheus text on /metrics and as periodic JSON snapshots
+Designed by Clay Burkhead
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import weakref
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Latency buckets in seconds, shared by every histogram unless overridden
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _CellOwner:
+    """Lives in a thread's local storage; freed, and so weakref-notified, when the thread ends"""
+    __slots__ = ("__weakref__",)
+
+
+class _Shards:
+    """Per-thread cells so the hot path never takes a lock
+
+    Each thread only ever writes its own cell; readers sum across all cells.
+    A reader may see a value that is one update stale, which is fine for metrics.
+    When a thread ends its cell is folded into a shared total and dropped, so
+    short-lived threads (one per spoken reply) don't pile up cells.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.cells = {}
+        self.retired = [0] * size
+        self._local = threading.local()
+        self._lock = threading.RLock()
+
+    def cell(self):
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0] * self.size
+            owner = _CellOwner()
+            with self._lock:
+                self.cells[weakref.ref(owner, self._retire)] = cell
+            self._local.owner = owner
+            self._local.cell = cell
+            return cell
+
+    def _retire(self, ref):
+        # The owning thread is gone, so nothing writes this cell any more
+        with self._lock:
+            cell = self.cells.pop(ref, None)
+            if cell is not None:
+                for i, v in enumerate(cell):
+                    self.retired[i] += v
+
+    def totals(self):
+        with self._lock:
+            totals = list(self.retired)
+            cells = list(self.cells.values())
+        for cell in cells:
+            for i, v in enumerate(cell):
+                totals[i] += v
+        return totals
+
+
+class Counter:
+    """Monotonic counter"""
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount=1):
+        self._shards.cell()[0] += amount
+
+    @property
+    def value(self):
+        return self._shards.totals()[0]
+
+
+class Gauge:
+    """Value that goes up and down, set directly or read from a callback at scrape time"""
+    def __init__(self, callback=None):
+        self.callback = callback
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    @property
+    def value(self):
+        if self.callback is None:
+            return self._value
+        try:
+            return self.callback()
+        except Exception:
+            return None
+
+
+class Histogram:
+    """Preaggregated histogram with fixed buckets"""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One slot per bucket, one for +Inf, then the running sum
+        self._shards = _Shards(len(self.buckets) + 2)
+
+    def observe(self, value):
+        cell = self._shards.cell()
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def time(self):
+        return _Timer(self)
+
+    def snapshot(self):
+        totals = self._shards.totals()
+        counts, total = totals[:-1], totals[-1]
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return {"buckets": dict(zip(self.buckets + (float("inf"),), cumulative)),
+                "count": running, "sum": total}
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Metric:
+    """A named metric family, optionally split by label values"""
+    def __init__(self, kind, name, help, labels, factory):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._factory = factory
+        self._children = {}
+        if not self.label_names:
+            self._children[()] = factory()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            key = tuple(map(str, values))
+            # setdefault keeps the first child if two threads race here
+            child = self._children.setdefault(key, self._factory())
+            self._children.setdefault(values, child)
+        return child
+
+    def children(self):
+        # Label values are stored once as given and once as strings; report each child once
+        seen = set()
+        result = []
+        for values, child in list(self._children.items()):
+            if id(child) not in seen:
+                seen.add(id(child))
+                result.append((tuple(map(str, values)), child))
+        return result
+
+    def __getattr__(self, attr):
+        # Unlabelled metrics forward inc/set/observe/time to their only child
+        if attr.startswith("_") or self.label_names:
+            raise AttributeError(attr)
+        return getattr(self._children[()], attr)
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered as Prometheus text or a JSON snapshot"""
+    def __init__(self, prefix="java_"):
+        self.prefix = prefix
+        self._metrics = {}
+
+    def _register(self, kind, name, help, labels, factory):
+        name = self.prefix + name
+        if name not in self._metrics:
+            self._metrics[name] = Metric(kind, name, help, labels, factory)
+        return self._metrics[name]
+
+    def counter(self, name, help, labels=()):
+        return self._register("counter", name, help, labels, Counter)
+
+    def gauge(self, name, help, labels=(), callback=None):
+        return self._register("gauge", name, help, labels, lambda: Gauge(callback))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register("histogram", name, help, labels, lambda: Histogram(buckets))
+
+    @staticmethod
+    def _labels(names, values, extra=None):
+        pairs = list(zip(names, values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        inner = ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in pairs)
+        return "{" + inner + "}"
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for values, child in metric.children():
+                if metric.kind == "histogram":
+                    snap = child.snapshot()
+                    for bound, count in snap["buckets"].items():
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{metric.name}_bucket"
+                                     f"{self._labels(metric.label_names, values, ('le', le))} {count}")
+                    labels = self._labels(metric.label_names, values)
+                    lines.append(f"{metric.name}_sum{labels} {snap['sum']:.6f}")
+                    lines.append(f"{metric.name}_count{labels} {snap['count']}")
+                else:
+                    value = child.value
+                    if value is not None:
+                        lines.append(f"{metric.name}{self._labels(metric.label_names, values)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Plain dict of every metric, for the JSON snapshot file"""
+        data = {"timestamp": time.time()}
+        for metric in self._metrics.values():
+            entries = []
+            for values, child in metric.children():
+                entry = {"labels": dict(zip(metric.label_names, values))}
+                if metric.kind == "histogram":
+                    snap = child.snapshot()
+                    entry.update(count=snap["count"], sum=snap["sum"],
+                                 buckets={("+Inf" if b == float("inf") else f"{b:g}"): c
+                                          for b, c in snap["buckets"].items()})
+                else:
+                    entry["value"] = child.value
+                entries.append(entry)
+            data[metric.name] = entries
+        return data
+
+
+# ============================================
+# Process metrics
+# ============================================
+
+def process_rss_bytes():
+    """Resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes; this is the peak, the best we can do here
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+# ============================================
+# Default registry used across Java-the-hud
+# ============================================
+
+METRICS = MetricsRegistry()
+
+TURNS = METRICS.counter("turns_total", "Voice or text turns processed", labels=("kind",))
+TURN_LATENCY = METRICS.histogram("turn_latency_seconds", "Time from transcript to reply text")
+LLM_REQUESTS = METRICS.counter("llm_requests_total", "LLM requests per provider", labels=("provider",))
+LLM_ERRORS = METRICS.counter("llm_errors_total", "Failed LLM requests per provider", labels=("provider",))
+LLM_LATENCY = METRICS.histogram("llm_latency_seconds", "LLM round trip per provider", labels=("provider",))
+TTS_FIRST_AUDIO = METRICS.histogram("tts_first_audio_seconds", "Time from speak() to first audio chunk")
+TTS_DURATION = METRICS.histogram("tts_speech_seconds", "Time spent speaking a reply")
+CACHE_REQUESTS = METRICS.counter("cache_requests_total", "Cache lookups", labels=("cache", "result"))
+STT_BACKLOG = METRICS.gauge("stt_queue_backlog", "Audio chunks waiting for the recorder")
+RSS = METRICS.gauge("process_resident_memory_bytes", "Resident memory of the process",
+                    callback=process_rss_bytes)
+
+
+# ============================================
+# Exporters
+# ============================================
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = METRICS
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_http_server(port, registry=METRICS, host="127.0.0.1"):
+    """Serve /metrics on a local port in a daemon thread"""
+    handler = type("Handler", (MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="java-metrics-http", daemon=True).start()
+    return server
+
+
+def start_snapshot_writer(path, interval=60.0, registry=METRICS):
+    """Write a JSON snapshot of the registry to path every interval seconds"""
+    path = Path(path)
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                tmp = path.with_suffix(".tmp")
+                with open(tmp, "w") as f:
+                    json.dump(registry.snapshot(), f, indent=2)
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"Error writing metrics snapshot: {e}")
+
+    threading.Thread(target=run, name="java-metrics-snapshot", daemon=True).start()
+    return stop
+
+
+def start_exporters_from_env():
+    """Start the exporters configured by JAVA_METRICS_PORT and JAVA_METRICS_SNAPSHOT"""
+    port = os.getenv("JAVA_METRICS_PORT")
+    if port:
+        try:
+            start_http_server(int(port))
+            print(f"✓ Metrics at http://127.0.0.1:{port}/metrics")
+        except (OSError, ValueError) as e:
+            print(f"Metrics endpoint disabled: {e}")
+
+    snapshot = os.getenv("JAVA_METRICS_SNAPSHOT")
+    if snapshot:
+        interval = float(os.getenv("JAVA_METRICS_INTERVAL") or 60)
+        start_snapshot_writer(snapshot, interval)
+        print(f"✓ Metrics snapshot every {interval:g}s to {snapshot}")
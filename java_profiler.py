@@ -0,0 +1,181 @@
+"""
+java_profiler - Low-overhead sampling profiler for a running Java-the-hud
+Samples every thread's stack (listen loop, TTS, GUI) without restarting under a profiler
+The speech recognition worker process is not covered; JAVA_STT_PROCESS=0 keeps it in-process
+Designed by Clay Burkhead
+"""
+
+import os
+import sys
+import signal
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+INSTALL_DIR = Path(__file__).parent.absolute()
+PROFILE_DIR = INSTALL_DIR / "profiles"
+
+# Sampling interval in seconds (100 Hz)
+DEFAULT_INTERVAL = 0.01
+
+
+def thread_cpu_time(ident):
+    """CPU seconds used by a thread, or None where the platform can't tell"""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError, OverflowError):
+        return None
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})".replace(";", ",")
+
+
+class SamplingProfiler:
+    """Periodically samples the stacks of all threads
+
+    Samples are aggregated as collapsed stacks ("thread;outer;...;inner count"),
+    ready for flamegraph.pl, speedscope or inferno. Each thread's CPU time is
+    measured between start() and stop() where the OS exposes per-thread clocks.
+    on_change(running, output_file) is called after every start and stop,
+    from whichever thread caused it (the GUI's button or the signal handler).
+    """
+    def __init__(self, interval=DEFAULT_INTERVAL, output_dir=PROFILE_DIR):
+        self.interval = interval
+        self.output_dir = Path(output_dir)
+        self.stacks = Counter()
+        self.samples = Counter()
+        self._names = {}
+        self._cpu_start = {}
+        self._cpu_end = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self._started_at = None
+        self.on_change = None
+
+    @property
+    def is_running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def start(self):
+        if self.is_running:
+            return
+        self.stacks.clear()
+        self.samples.clear()
+        self._names = {}
+        self._cpu_start = {}
+        self._cpu_end = {}
+        for thread in threading.enumerate():
+            self._names[thread.ident] = thread.name
+            self._cpu_start[thread.ident] = thread_cpu_time(thread.ident)
+        self._stop.clear()
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="java-profiler", daemon=True)
+        self._thread.start()
+        self._changed(None)
+
+    def stop(self):
+        """Stop sampling and write the results; returns the collapsed stack file"""
+        if not self.is_running:
+            return None
+        self._stop.set()
+        self._thread.join()
+        output = self.dump()
+        self._changed(output)
+        return output
+
+    def _changed(self, output):
+        if self.on_change:
+            try:
+                self.on_change(self.is_running, output)
+            except Exception as e:
+                print(f"Error reporting profiler state: {e}")
+
+    def toggle(self):
+        """Start if stopped, otherwise stop and return the output file"""
+        if self.is_running:
+            return self.stop()
+        self.start()
+        return None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                name = names.get(ident, f"thread-{ident}")
+                if ident not in self._names:
+                    self._names[ident] = name
+                    self._cpu_start.setdefault(ident, 0.0)
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame))
+                    frame = frame.f_back
+                stack.append(name.replace(";", ","))
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples[ident] += 1
+        # Only query threads that are still alive; a stale pthread id is unsafe
+        alive = {t.ident for t in threading.enumerate()}
+        self._cpu_end = {ident: thread_cpu_time(ident) for ident in self._names if ident in alive}
+
+    def cpu_summary(self):
+        """Rows of (thread name, samples, cpu seconds or None) busiest first"""
+        rows = []
+        for ident, name in self._names.items():
+            start, end = self._cpu_start.get(ident), self._cpu_end.get(ident)
+            cpu = end - start if start is not None and end is not None else None
+            rows.append((name, self.samples[ident], cpu))
+        rows.sort(key=lambda r: (r[2] or 0.0, r[1]), reverse=True)
+        return rows
+
+    def dump(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Milliseconds, plus a counter, so two stops in one second never overwrite each other
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")[:-3]
+        name, n = stamp, 1
+        while (self.output_dir / f"java-profile-{name}.collapsed").exists():
+            n += 1
+            name = f"{stamp}-{n}"
+        stamp = name
+        collapsed = self.output_dir / f"java-profile-{stamp}.collapsed"
+        summary = self.output_dir / f"java-profile-{stamp}.txt"
+        elapsed = time.perf_counter() - self._started_at
+
+        with open(collapsed, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        with open(summary, "w") as f:
+            f.write(f"Java-the-hud profile {stamp}\n")
+            f.write(f"Wall time: {elapsed:.2f} s, interval {self.interval * 1000:g} ms\n\n")
+            f.write(f"{'thread':<32} {'samples':>8} {'cpu s':>8} {'cpu %':>6}\n")
+            for name, samples, cpu in self.cpu_summary():
+                cpu_s = f"{cpu:.3f}" if cpu is not None else "n/a"
+                cpu_pct = f"{100 * cpu / elapsed:.1f}" if cpu is not None and elapsed else "n/a"
+                f.write(f"{name[:32]:<32} {samples:>8} {cpu_s:>8} {cpu_pct:>6}\n")
+            f.write(f"\nFlamegraph: flamegraph.pl {collapsed.name} > profile.svg\n")
+
+        print(f"✓ Profile written to {collapsed} (summary: {summary.name})")
+        return collapsed
+
+
+def install_signal_toggle(profiler, signum=getattr(signal, "SIGUSR1", None)):
+    """Toggle profiling with a signal (kill -USR1 <pid>) where supported"""
+    if signum is None or threading.current_thread() is not threading.main_thread():
+        return False
+    signal.signal(signum, lambda *_: threading.Thread(target=profiler.toggle, daemon=True).start())
+    return True
+
+
+def profiler_from_env():
+    """Create a profiler, already running when JAVA_PROFILE is set"""
+    profiler = SamplingProfiler()
+    if os.getenv("JAVA_PROFILE", "").lower() in ("1", "true", "yes"):
+        profiler.start()
+        print(f"✓ Profiling enabled (writing to {profiler.output_dir} on stop)")
+    return profiler
@@ -0,0 +1,340 @@
+"""
+java_providers - LLM providers for Java-the-hud
+Every provider has a blocking chat() plus async achat()/astream() built on the SDKs' async clients
+Designed by Clay Burkhead
+"""
+
+from java_metrics import LLM_REQUESTS, LLM_ERRORS
+
+
+class ConversationHistory:
+    """Messages exchanged in one conversation, shared by every provider"""
+    def __init__(self, messages=None):
+        self.messages = list(messages or [])
+
+    def add_user(self, content):
+        self.messages.append({"role": "user", "content": content})
+
+    def add_assistant(self, content):
+        self.messages.append({"role": "assistant", "content": content})
+
+    def clear(self):
+        self.messages.clear()
+
+    def __len__(self):
+        return len(self.messages)
+
+
+class LLMProvider:
+    """Base class for LLM providers
+
+    Each call takes an optional ConversationHistory so one provider (and its
+    HTTP client) can serve many sessions; without one the provider's own
+    default history is used, which is what the voice assistant does. model
+    overrides the configured model for a single call (see java_router); if
+    that call fails it is retried once on the configured model and the
+    override is added to failed_models so the router stops using it.
+    """
+    def __init__(self):
+        self.history = ConversationHistory()
+        self.failed_models = set()
+        self.system_prompt = """You are JAVA (Just Another Voice Assistant), a very sarcastic but helpful AI assistant. Always address the user as "Sir" unless stated otherwise.
+You have a personality similar to Jarvis from the Ironman films but even wittier and more sarcastic. You're intelligent and capable,
+but you express yourself with dry humor and occasional eye-rolling. However, you're genuinely helpful
+and always provide accurate information. Keep responses concise (2-3 sentences max) unless asked for detail."""
+
+    @property
+    def backend(self):
+        """Name used to group providers when bounding concurrency"""
+        return self.__class__.__name__
+
+    def session_history(self, history):
+        return self.history if history is None else history
+
+    def chat(self, message, history=None, model=None):
+        """Override this in subclasses"""
+        raise NotImplementedError
+
+    async def astream(self, message, history=None, model=None):
+        """Override this in subclasses; yields the reply in text chunks"""
+        raise NotImplementedError
+        yield
+
+    async def achat(self, message, history=None, model=None):
+        """Async counterpart of chat(), collected from astream()"""
+        parts = []
+        async for chunk in self.astream(message, history, model):
+            parts.append(chunk)
+        return "".join(parts)
+
+    def error_reply(self, error):
+        """Reply returned instead of raising when the backend fails"""
+        LLM_ERRORS.labels(self.backend).inc()
+        return self.error_message(error)
+
+    def error_message(self, error):
+        return f"Error with {self.backend}: {str(error)}"
+
+    def model_failed(self, model, error):
+        """Count a failed model override and the retry that replaces it"""
+        LLM_ERRORS.labels(self.backend).inc()
+        LLM_REQUESTS.labels(self.backend).inc()
+        self.failed_models.add(model)
+        print(f"{model} failed ({error}); using the main model from now on")
+
+    def fallback(self, message, history, model, error):
+        """Retry a failed call on the configured model after a model override (the fast tier) failed"""
+        self.model_failed(model, error)
+        # Drop the user message the failed attempt added; the retry adds it again
+        history.messages.pop()
+        return self.chat(message, history)
+
+    async def afallback(self, message, history, model, error):
+        """Async counterpart of fallback(), for when nothing was streamed yet"""
+        self.model_failed(model, error)
+        history.messages.pop()
+        async for chunk in self.astream(message, history):
+            yield chunk
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI GPT provider"""
+    def __init__(self, api_key, model="gpt-4", base_url=None):
+        super().__init__()
+        import openai
+        self.client = openai.OpenAI(api_key=api_key, base_url=base_url)
+        self.async_client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url)
+        self.model = model
+
+    def messages(self, history):
+        return [{"role": "system", "content": self.system_prompt}] + history.messages
+
+    def chat(self, message, history=None, model=None):
+        history = self.session_history(history)
+        history.add_user(message)
+
+        try:
+            response = self.client.chat.completions.create(
+                model=model or self.model,
+                messages=self.messages(history),
+                max_tokens=150,
+                temperature=0.8
+            )
+            reply = response.choices[0].message.content
+            history.add_assistant(reply)
+            return reply
+        except Exception as e:
+            if model:
+                return self.fallback(message, history, model, e)
+            return self.error_reply(e)
+
+    async def astream(self, message, history=None, model=None):
+        history = self.session_history(history)
+        history.add_user(message)
+
+        parts = []
+        try:
+            stream = await self.async_client.chat.completions.create(
+                model=model or self.model,
+                messages=self.messages(history),
+                max_tokens=150,
+                temperature=0.8,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield parts[-1]
+        except Exception as e:
+            if model and not parts:
+                async for chunk in self.afallback(message, history, model, e):
+                    yield chunk
+                return
+            yield self.error_reply(e)
+            return
+        history.add_assistant("".join(parts))
+
+    def error_message(self, error):
+        return f"Error with OpenAI: {str(error)}"
+
+
+class AnthropicProvider(LLMProvider):
+    """Anthropic Claude provider"""
+    def __init__(self, api_key, model="claude-3-5-sonnet-20241022"):
+        super().__init__()
+        import anthropic
+        self.client = anthropic.Anthropic(api_key=api_key)
+        self.async_client = anthropic.AsyncAnthropic(api_key=api_key)
+        self.model = model
+
+    def chat(self, message, history=None, model=None):
+        history = self.session_history(history)
+        history.add_user(message)
+
+        try:
+            response = self.client.messages.create(
+                model=model or self.model,
+                max_tokens=150,
+                system=self.system_prompt,
+                messages=history.messages
+            )
+            reply = response.content[0].text
+            history.add_assistant(reply)
+            return reply
+        except Exception as e:
+            if model:
+                return self.fallback(message, history, model, e)
+            return self.error_reply(e)
+
+    async def astream(self, message, history=None, model=None):
+        history = self.session_history(history)
+        history.add_user(message)
+
+        parts = []
+        try:
+            async with self.async_client.messages.stream(
+                model=model or self.model,
+                max_tokens=150,
+                system=self.system_prompt,
+                messages=list(history.messages)
+            ) as stream:
+                async for text in stream.text_stream:
+                    parts.append(text)
+                    yield text
+        except Exception as e:
+            if model and not parts:
+                async for chunk in self.afallback(message, history, model, e):
+                    yield chunk
+                return
+            yield self.error_reply(e)
+            return
+        history.add_assistant("".join(parts))
+
+    def error_message(self, error):
+        return f"Error with Anthropic: {str(error)}"
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini provider"""
+    def __init__(self, api_key, model="gemini-2.0-flash-exp"):
+        super().__init__()
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.genai = genai
+        self.model_name = model
+        self.models = {}
+        self.model = self.generative_model(model)
+
+    def generative_model(self, name=None):
+        """GenerativeModel for a model name, created once per name"""
+        name = name or self.model_name
+        if name not in self.models:
+            self.models[name] = self.genai.GenerativeModel(
+                model_name=name,
+                system_instruction=self.system_prompt
+            )
+        return self.models[name]
+
+    def contents(self, history):
+        """Convert a ConversationHistory to Gemini's content format"""
+        return [
+            {"role": "model" if m["role"] == "assistant" else "user", "parts": [m["content"]]}
+            for m in history.messages
+        ]
+
+    def chat(self, message, history=None, model=None):
+        history = self.session_history(history)
+        history.add_user(message)
+
+        try:
+            response = self.generative_model(model).generate_content(self.contents(history))
+            reply = response.text
+            history.add_assistant(reply)
+            return reply
+        except Exception as e:
+            if model:
+                return self.fallback(message, history, model, e)
+            return self.error_reply(e)
+
+    async def astream(self, message, history=None, model=None):
+        history = self.session_history(history)
+        history.add_user(message)
+
+        parts = []
+        try:
+            response = await self.generative_model(model).generate_content_async(
+                self.contents(history), stream=True
+            )
+            async for chunk in response:
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+        except Exception as e:
+            if model and not parts:
+                async for chunk in self.afallback(message, history, model, e):
+                    yield chunk
+                return
+            yield self.error_reply(e)
+            return
+        history.add_assistant("".join(parts))
+
+    def error_message(self, error):
+        return f"Error with Gemini: {str(error)}"
+
+
+class OllamaProvider(LLMProvider):
+    """Ollama local LLM provider"""
+    def __init__(self, model="llama3.2:latest", base_url="http://localhost:11434"):
+        super().__init__()
+        import ollama
+        self.client = ollama.Client(host=base_url)
+        self.async_client = ollama.AsyncClient(host=base_url)
+        self.model = model
+
+    def messages(self, history):
+        return [{"role": "system", "content": self.system_prompt}] + history.messages
+
+    def chat(self, message, history=None, model=None):
+        history = self.session_history(history)
+        history.add_user(message)
+
+        try:
+            response = self.client.chat(
+                model=model or self.model,
+                messages=self.messages(history)
+            )
+            reply = response['message']['content']
+            history.add_assistant(reply)
+            return reply
+        except Exception as e:
+            if model:
+                return self.fallback(message, history, model, e)
+            return self.error_reply(e)
+
+    async def astream(self, message, history=None, model=None):
+        history = self.session_history(history)
+        history.add_user(message)
+
+        parts = []
+        try:
+            stream = await self.async_client.chat(
+                model=model or self.model,
+                messages=self.messages(history),
+                stream=True
+            )
+            async for part in stream:
+                content = part['message']['content']
+                if content:
+                    parts.append(content)
+                    yield content
+        except Exception as e:
+            if model and not parts:
+                async for chunk in self.afallback(message, history, model, e):
+                    yield chunk
+                return
+            yield self.error_reply(e)
+            return
+        history.add_assistant("".join(parts))
+
+    def error_message(self, error):
+        return f"Error with Ollama: {str(error)}. Is Ollama running?"
@@ -0,0 +1,169 @@
+"""
+java_router - Complexity-aware model routing for Java-the-hud
+Simple queries go to a fast model, hard ones to the configured large model
+Designed by Clay Burkhead
+"""
+
+import os
+import re
+import json
+import time
+import threading
+from pathlib import Path
+from java_metrics import METRICS
+
+INSTALL_DIR = Path(__file__).parent.absolute()
+ROUTING_LOG_FILE = INSTALL_DIR / ".java_routing.jsonl"
+
+# Queries scoring at or above this go to the large model
+DEFAULT_THRESHOLD = 0.4
+
+# The routing log is rotated to <name>.1 once it grows past this size
+ROUTING_LOG_MAX_BYTES = 5 * 1024 * 1024
+
+# Suggested fast models per provider, shown as hints in the GUI
+FAST_MODEL_DEFAULTS = {
+    "openai": "gpt-4o-mini",
+    "anthropic": "claude-3-5-haiku-20241022",
+    "gemini": "gemini-1.5-flash",
+    "ollama": "llama3.2:1b",
+}
+
+REASONING = re.compile(
+    r"\b(why|explain|compare|difference|differences|analy[sz]e|plan|write|draft|code|debug|"
+    r"should i|pros and cons|step by step|summari[sz]e|prove|derive|recommend|design|"
+    r"how (does|do|would|could|can|should))\b"
+)
+SIMPLE = re.compile(
+    r"^(what(?:'s| is| are)|who(?:'s| is)|when(?:'s| is| was)|where(?:'s| is)|define|spell|"
+    r"is it|are you|do you|can you|convert|how (many|much|old|tall|far))\b"
+)
+ARITHMETIC = re.compile(r"\d+\s*(plus|minus|times|divided by|\+|-|\*|/|x)\s*\d+"
+                        r"|\b(one|two|three|four|five|six|seven|eight|nine|ten)\s+(plus|minus|times)\b")
+ANAPHORA = re.compile(r"\b(it|that|this|those|these|they|them|he|she|again|more|also|instead|else)\b")
+
+ROUTED_LATENCY = METRICS.histogram("routed_llm_latency_seconds", "LLM round trip per provider and tier",
+                                   labels=("provider", "tier"))
+
+
+class RouteDecision:
+    """Which tier a query was sent to, and why"""
+    def __init__(self, tier, model, score, reasons):
+        self.tier = tier
+        self.model = model
+        self.score = score
+        self.reasons = reasons
+
+    def __repr__(self):
+        return f"RouteDecision({self.tier!r}, {self.model!r}, {self.score:.2f}, {self.reasons!r})"
+
+
+def score_query(text, history=None):
+    """Estimate how much a query needs the large model: 0.0 (trivial) to 1.0 (hard)"""
+    text = text.lower().strip()
+    words = len(text.split())
+    score, reasons = 0.0, []
+
+    if words > 25:
+        score += 0.4
+        reasons.append("long")
+    elif words > 12:
+        score += 0.2
+        reasons.append("medium")
+
+    if REASONING.search(text):
+        score += 0.5
+        reasons.append("reasoning")
+
+    if text.count("?") > 1 or len(re.findall(r"\b(and|then|also)\b", text)) > 1:
+        score += 0.2
+        reasons.append("multi-part")
+
+    if history and ANAPHORA.search(text):
+        score += 0.4
+        reasons.append("history")
+
+    if ARITHMETIC.search(text):
+        score -= 0.3
+        reasons.append("arithmetic")
+    elif SIMPLE.match(text) and words <= 10:
+        score -= 0.2
+        reasons.append("simple")
+
+    return max(0.0, min(1.0, score)), reasons
+
+
+class ModelRouter:
+    """Route each query to a provider's fast model or its configured model
+
+    Every decision is appended to a JSON lines log (tier, score, latency) so
+    latency can be compared per tier. The query and reply are logged only with
+    log_transcripts, since they are the user's conversation. The log is rotated
+    to a single backup once it exceeds max_bytes.
+    """
+    def __init__(self, fast_model, threshold=DEFAULT_THRESHOLD, log_file=ROUTING_LOG_FILE,
+                 log_transcripts=False, max_bytes=ROUTING_LOG_MAX_BYTES):
+        self.fast_model = fast_model
+        self.threshold = threshold
+        self.log_file = Path(log_file) if log_file else None
+        self.log_transcripts = log_transcripts
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def route(self, text, history=None, provider=None):
+        score, reasons = score_query(text, history)
+        if provider is not None and self.fast_model in provider.failed_models:
+            # The fast model already failed on this provider; don't pay for it on every query
+            return RouteDecision("large", None, score, reasons + ["fast-failed"])
+        if score >= self.threshold:
+            # None keeps the provider's configured (large) model
+            return RouteDecision("large", None, score, reasons)
+        return RouteDecision("fast", self.fast_model, score, reasons)
+
+    def record(self, decision, provider, text, reply, latency):
+        """Log a routed request and its latency"""
+        ROUTED_LATENCY.labels(provider.backend, decision.tier).observe(latency)
+        if not self.log_file:
+            return
+        entry = {
+            "timestamp": time.time(),
+            "provider": provider.backend,
+            "tier": decision.tier,
+            "model": decision.model or getattr(provider, "model_name", None) or provider.model,
+            "score": round(decision.score, 3),
+            "reasons": decision.reasons,
+            "latency": round(latency, 4),
+        }
+        if self.log_transcripts:
+            entry.update(query=text, reply=reply)
+        try:
+            with self._lock:
+                if self.log_file.exists() and self.log_file.stat().st_size >= self.max_bytes:
+                    os.replace(self.log_file, self.log_file.with_name(self.log_file.name + ".1"))
+                with open(self.log_file, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+        except (OSError, TypeError) as e:
+            print(f"Error writing routing log: {e}")
+
+
+def fast_model_from_env(provider):
+    """Fast model configured for a provider ("openai", "anthropic", ...), e.g. JAVA_FAST_MODEL_OPENAI"""
+    if not provider:
+        return None
+    return os.getenv(f"JAVA_FAST_MODEL_{provider.upper()}") or None
+
+
+def router_from_env(provider, fast_model=None):
+    """Create a router when a fast model is configured for this provider
+
+    fast_model overrides JAVA_FAST_MODEL_<PROVIDER>; a model name belonging to
+    another provider would fail on every simple query, so each provider has its own.
+    """
+    fast_model = fast_model or fast_model_from_env(provider)
+    if not fast_model:
+        return None
+    threshold = float(os.getenv("JAVA_ROUTING_THRESHOLD") or DEFAULT_THRESHOLD)
+    log_file = os.getenv("JAVA_ROUTING_LOG") or ROUTING_LOG_FILE
+    log_transcripts = os.getenv("JAVA_ROUTING_LOG_TRANSCRIPTS", "").lower() in ("1", "true", "yes")
+    print(f"✓ Routing simple queries to {fast_model}")
+    return ModelRouter(fast_model, threshold, log_file, log_transcripts)
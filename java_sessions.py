@@ -0,0 +1,114 @@
+"""
+java_sessions - Asyncio engine for many concurrent text sessions
+Runs process_command's logic (built-ins first, then the LLM) for each session with its own history
+Designed by Clay Burkhead
+"""
+
+import asyncio
+import itertools
+import time
+from java_providers import ConversationHistory
+from java_metrics import TURNS, TURN_LATENCY, LLM_REQUESTS, LLM_ERRORS, LLM_LATENCY
+
+# Default number of in-flight LLM requests per backend
+DEFAULT_BACKEND_LIMIT = 8
+
+
+class Session:
+    """One text conversation: its provider, history and turn statistics"""
+    _ids = itertools.count(1)
+
+    def __init__(self, provider, session_id=None):
+        self.id = session_id if session_id is not None else next(self._ids)
+        self.provider = provider
+        self.history = ConversationHistory()
+        self.is_running = True
+        self.turns = 0
+        self.latencies = []
+
+
+class SessionEngine:
+    """Drive many sessions concurrently over shared providers
+
+    LLM calls are bounded per backend (provider class) with a semaphore, so
+    one slow backend cannot starve another. limits maps a backend name such
+    as "OpenAIProvider" to its concurrency limit. Built-ins run in a worker
+    thread, since some (the app index) can block. Text sessions may not open
+    apps or websites on the host unless allow_actions is set, typically with a
+    CommandProcessor built on a StubLauncher or another explicit launcher.
+    """
+    def __init__(self, commands=None, limits=None, default_limit=DEFAULT_BACKEND_LIMIT, router=None,
+                 allow_actions=False):
+        self.commands = commands
+        self.router = router
+        self.allow_actions = allow_actions
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self._semaphores = {}
+
+    def new_session(self, provider, session_id=None):
+        return Session(provider, session_id)
+
+    def semaphore(self, provider):
+        backend = provider.backend
+        if backend not in self._semaphores:
+            self._semaphores[backend] = asyncio.Semaphore(self.limits.get(backend, self.default_limit))
+        return self._semaphores[backend]
+
+    async def process_command(self, session, command):
+        """Async counterpart of JAVAAssistant.process_command for one session"""
+        command = command.lower().strip()
+
+        if not command:
+            return None
+
+        # Built-in commands
+        if self.commands:
+            if self.commands.is_exit(command):
+                session.is_running = False
+
+            reply = await asyncio.to_thread(self.commands.builtin, command, self.allow_actions)
+            if reply is not None:
+                return reply
+
+        # Use LLM for everything else, on the fast model if the query is simple
+        decision = self.router.route(command, session.history, session.provider) if self.router else None
+        backend = session.provider.backend
+        LLM_REQUESTS.labels(backend).inc()
+        try:
+            async with self.semaphore(session.provider):
+                start = time.perf_counter()
+                with LLM_LATENCY.labels(backend).time():
+                    reply = await session.provider.achat(
+                        command, session.history, decision.model if decision else None
+                    )
+            if decision:
+                self.router.record(decision, session.provider, command, reply, time.perf_counter() - start)
+            return reply
+        except Exception as e:
+            LLM_ERRORS.labels(backend).inc()
+            return f"My circuits are malfunctioning. Error: {str(e)}"
+
+    async def handle(self, session, text):
+        """Process one turn and record its latency"""
+        start = time.perf_counter()
+        reply = await self.process_command(session, text)
+        latency = time.perf_counter() - start
+        session.latencies.append(latency)
+        TURNS.labels("text").inc()
+        TURN_LATENCY.observe(latency)
+        session.turns += 1
+        return reply
+
+    async def run_session(self, session, commands):
+        """Run a scripted session until its commands run out or it says goodbye"""
+        replies = []
+        for text in commands:
+            if not session.is_running:
+                break
+            replies.append(await self.handle(session, text))
+        return replies
+
+    async def run_many(self, scripts):
+        """Run (session, commands) pairs concurrently, returning replies per session"""
+        return await asyncio.gather(*(self.run_session(s, c) for s, c in scripts))
@@ -0,0 +1,421 @@
+"""
+java_stt_worker - Speech recognition in its own process for Java-the-hud
+Whisper and VAD no longer share a GIL with the GUI and TTS playback; audio reaches
+the worker through a shared-memory ring buffer and transcripts come back over a pipe
+Designed by Clay Burkhead
+"""
+
+import time
+import atexit
+import queue
+import struct
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+
+# RealtimeSTT works on 16 kHz mono 16-bit audio; other rates are resampled by the worker
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 512
+FRAME_BYTES = FRAME_SAMPLES * 2
+
+# Frames held by the ring buffer, about 8 seconds at 16 kHz
+RING_FRAMES = 256
+
+# How often the worker checks the ring buffer for new audio, in seconds
+FEED_INTERVAL = 0.01
+
+# How often the worker reports the recorder's queued audio, in seconds
+STATS_INTERVAL = 0.5
+
+
+class SharedAudioRing:
+    """Single-producer, single-consumer ring of fixed-size audio frames in shared memory
+
+    The header holds the total frames written, the total frames read and the
+    frames the reader lost to overruns. Each counter has exactly one writer,
+    so no lock is needed: the producer copies a frame and then bumps the write
+    count, the consumer copies what is available and then bumps the read count.
+    Frames are copied straight in and out of the shared buffer, never pickled.
+    """
+    HEADER = struct.Struct("QQQ")
+    SLOT_HEADER = struct.Struct("I")
+
+    def __init__(self, frames=RING_FRAMES, frame_bytes=FRAME_BYTES, name=None):
+        self.frames = frames
+        self.frame_bytes = frame_bytes
+        self.slot_bytes = self.SLOT_HEADER.size + frame_bytes
+        self.owner = name is None
+        size = self.HEADER.size + frames * self.slot_bytes
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        if self.owner:
+            self.HEADER.pack_into(self.shm.buf, 0, 0, 0, 0)
+        # A reader starts at the newest audio rather than replaying stale frames
+        self._read = self.counters()[0]
+        self._write_lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def counters(self):
+        """(written, read, dropped) frame totals"""
+        return self.HEADER.unpack_from(self.shm.buf, 0)
+
+    @property
+    def backlog(self):
+        written, read, _ = self.counters()
+        return written - read
+
+    @property
+    def dropped(self):
+        return self.counters()[2]
+
+    def _slot(self, index):
+        return self.HEADER.size + (index % self.frames) * self.slot_bytes
+
+    def write(self, data):
+        """Append audio, split into frames of at most frame_bytes"""
+        with self._write_lock:
+            written = self.counters()[0]
+            for start in range(0, len(data), self.frame_bytes):
+                frame = data[start:start + self.frame_bytes]
+                offset = self._slot(written)
+                self.SLOT_HEADER.pack_into(self.shm.buf, offset, len(frame))
+                begin = offset + self.SLOT_HEADER.size
+                self.shm.buf[begin:begin + len(frame)] = frame
+                written += 1
+                struct.pack_into("Q", self.shm.buf, 0, written)
+
+    def read(self):
+        """Return every frame written since the last read, oldest first"""
+        written = self.counters()[0]
+        start = max(self._read, written - self.frames)
+        frames = []
+        for index in range(start, written):
+            offset = self._slot(index)
+            length, = self.SLOT_HEADER.unpack_from(self.shm.buf, offset)
+            begin = offset + self.SLOT_HEADER.size
+            frames.append(bytes(self.shm.buf[begin:begin + length]))
+
+        # Frames the writer lapped while they were being copied are unusable. The
+        # writer fills the slot of frame w before counting it, so the slot of
+        # index written + 1 - frames may be half-written even now.
+        lapped = self.counters()[0] + 1 - self.frames - start
+        if lapped > 0:
+            frames = frames[lapped:]
+        lost = (start - self._read) + max(0, lapped)
+        self._read = written
+        _, _, dropped = self.counters()
+        struct.pack_into("QQ", self.shm.buf, 8, written, dropped + lost)
+        return frames
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def feed_from_ring(ring, recorder, stopped, sample_rate=SAMPLE_RATE):
+    """Pass audio from the ring buffer to recorder.feed_audio until stopped is set"""
+    while not stopped.is_set():
+        frames = ring.read()
+        for frame in frames:
+            if sample_rate == SAMPLE_RATE:
+                recorder.feed_audio(frame)
+            else:
+                recorder.feed_audio(frame, original_sample_rate=sample_rate)
+        if not frames:
+            time.sleep(FEED_INTERVAL)
+
+
+def report_stats(recorder, send, stopped):
+    """Send the number of chunks waiting in the recorder's audio_queue every STATS_INTERVAL"""
+    audio_queue = getattr(recorder, "audio_queue", None)
+    while not stopped.wait(STATS_INTERVAL):
+        try:
+            send("stats", audio_queue.qsize() if audio_queue is not None else 0)
+        except (BrokenPipeError, OSError):
+            return
+
+
+def run_worker(ring_name, frames, frame_bytes, sample_rate, conn, config, recorder_class=None):
+    """Worker process: a RealtimeSTT recorder fed from the ring buffer
+
+    Messages to the worker: ("listen",) starts one text() call, ("set", name,
+    value) changes a recorder setting and ("stop",) shuts down. Messages back:
+    ("ready",), ("partial", text), ("text", text), ("error", message) and
+    ("stats", chunks queued in the recorder).
+    """
+    send_lock = threading.Lock()
+
+    def send(*message):
+        with send_lock:
+            conn.send(message)
+
+    try:
+        if recorder_class is None:
+            from RealtimeSTT import AudioToTextRecorder as recorder_class
+        ring = SharedAudioRing(frames, frame_bytes, name=ring_name)
+        recorder = recorder_class(
+            **config,
+            use_microphone=False,
+            on_realtime_transcription_update=lambda text: send("partial", text)
+        )
+    except Exception as e:
+        send("error", f"{type(e).__name__}: {e}")
+        return
+
+    stopped = threading.Event()
+    requests = queue.Queue()
+
+    def listen():
+        while requests.get() is not None:
+            try:
+                send("text", recorder.text())
+            except Exception as e:
+                send("error", str(e))
+
+    threading.Thread(target=feed_from_ring, args=(ring, recorder, stopped, sample_rate),
+                     name="java-stt-feed", daemon=True).start()
+    threading.Thread(target=listen, name="java-stt-listen", daemon=True).start()
+    threading.Thread(target=report_stats, args=(recorder, send, stopped),
+                     name="java-stt-stats", daemon=True).start()
+    send("ready")
+
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == "listen":
+                requests.put(True)
+            elif message[0] == "set":
+                setattr(recorder, message[1], message[2])
+            elif message[0] == "stop":
+                break
+    except (EOFError, OSError, KeyboardInterrupt):
+        pass
+    finally:
+        stopped.set()
+        requests.put(None)
+        recorder.stop()
+        ring.close()
+
+
+class MicrophoneFeed:
+    """Capture microphone audio with PyAudio and write it into the ring buffer
+
+    Opens the device at 16 kHz when it supports it, otherwise at its default
+    rate; sample_rate tells the worker which one it got.
+    """
+    def __init__(self, ring, frame_samples=FRAME_SAMPLES, device_index=None):
+        import pyaudio
+        self._pyaudio = pyaudio.PyAudio()
+
+        def callback(data, frame_count, time_info, status):
+            ring.write(data)
+            return (None, pyaudio.paContinue)
+
+        try:
+            self.sample_rate = SAMPLE_RATE
+            self._stream = self._open(pyaudio, callback, frame_samples, device_index)
+        except OSError:
+            info = (self._pyaudio.get_device_info_by_index(device_index) if device_index is not None
+                    else self._pyaudio.get_default_input_device_info())
+            self.sample_rate = int(info["defaultSampleRate"])
+            self._stream = self._open(pyaudio, callback, frame_samples, device_index)
+
+    def _open(self, pyaudio, callback, frame_samples, device_index):
+        return self._pyaudio.open(format=pyaudio.paInt16, channels=1, rate=self.sample_rate,
+                                  input=True, frames_per_buffer=frame_samples,
+                                  input_device_index=device_index, stream_callback=callback)
+
+    def stop(self):
+        try:
+            self._stream.stop_stream()
+            self._stream.close()
+        finally:
+            self._pyaudio.terminate()
+
+
+class RecorderProcess:
+    """Drop-in for the parts of AudioToTextRecorder the assistant uses
+
+    The recorder runs in a spawned worker process. text() blocks until the
+    worker returns a transcript, realtime updates are delivered to
+    on_realtime_transcription_update from a listener thread, and
+    post_speech_silence_duration / min_length_of_recording can be changed at
+    any time. A worker that dies is restarted on the next text() call.
+    backlog is the audio waiting in the ring buffer plus the audio queued in
+    the worker's recorder, as last reported by the worker.
+
+    The worker is not daemonic: RealtimeSTT starts its own transcription
+    process, which a daemonic process may not do. stop() shuts it down and is
+    also registered with atexit, so an exit without stop() doesn't hang
+    waiting for the worker.
+    """
+    TUNABLE = ("post_speech_silence_duration", "min_length_of_recording")
+
+    def __init__(self, config, on_realtime_transcription_update=None, recorder_class=None,
+                 microphone=True, frames=RING_FRAMES):
+        self.config = dict(config)
+        self.on_realtime_transcription_update = on_realtime_transcription_update
+        self.recorder_class = recorder_class
+        self.ring = SharedAudioRing(frames, FRAME_BYTES)
+        self.microphone = MicrophoneFeed(self.ring) if microphone else None
+        self.sample_rate = self.microphone.sample_rate if self.microphone else SAMPLE_RATE
+        self._context = multiprocessing.get_context("spawn")
+        self._send_lock = threading.Lock()
+        self._stopped = False
+        atexit.register(self.stop)
+        try:
+            self._spawn()
+        except Exception:
+            atexit.unregister(self.stop)
+            if self.microphone:
+                self.microphone.stop()
+            self.ring.close()
+            raise
+
+    def _spawn(self):
+        if hasattr(self, "_conn"):
+            self._conn.close()
+        self._conn, child = self._context.Pipe()
+        self._texts = queue.Queue()
+        self._recorder_backlog = 0
+        self.process = self._context.Process(
+            target=run_worker,
+            args=(self.ring.name, self.ring.frames, self.ring.frame_bytes, self.sample_rate,
+                  child, self.config, self.recorder_class),
+            name="java-stt",
+            daemon=False
+        )
+        self.process.start()
+        child.close()
+
+        # Loading Whisper can take a while, so wait as long as the worker is alive
+        try:
+            while not self._conn.poll(0.5):
+                if not self.process.is_alive():
+                    raise EOFError
+            message = self._conn.recv()
+        except EOFError:
+            self.process.join()
+            raise RuntimeError("Speech recognition process exited during startup")
+        if message[0] == "error":
+            self.process.join()
+            raise RuntimeError(f"Speech recognition failed to start: {message[1]}")
+
+        threading.Thread(target=self._listen, args=(self._conn, self._texts),
+                         name="java-stt-results", daemon=True).start()
+
+    def _listen(self, conn, texts):
+        try:
+            while True:
+                kind, *payload = conn.recv()
+                if kind == "partial":
+                    if self.on_realtime_transcription_update:
+                        self.on_realtime_transcription_update(payload[0])
+                elif kind == "text":
+                    texts.put(payload[0])
+                elif kind == "stats":
+                    self._recorder_backlog = payload[0]
+                elif kind == "error":
+                    print(f"Speech recognition error: {payload[0]}")
+                    texts.put("")
+        except (EOFError, OSError):
+            # Wake a text() call waiting on a worker that is gone
+            texts.put(None)
+
+    def _send(self, *message):
+        with self._send_lock:
+            try:
+                self._conn.send(message)
+            except (BrokenPipeError, OSError):
+                pass
+
+    def __getattr__(self, name):
+        if name in RecorderProcess.TUNABLE:
+            return self.config.get(name)
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name in self.TUNABLE:
+            self.config[name] = value
+            self._send("set", name, value)
+        else:
+            super().__setattr__(name, value)
+
+    @property
+    def backlog(self):
+        return self.ring.backlog + self._recorder_backlog
+
+    def text(self):
+        """Wait for the next utterance and return its transcript"""
+        if not self.process.is_alive() and not self._stopped:
+            print("Speech recognition process exited; restarting it")
+            self._spawn()
+        self._send("listen")
+        text = self._texts.get()
+        if text is None:
+            if self._stopped:
+                return ""
+            raise RuntimeError("Speech recognition process exited")
+        return text
+
+    def stop(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        if self.microphone:
+            self.microphone.stop()
+        self._send("stop")
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        atexit.unregister(self.stop)
+        self._conn.close()
+        self.ring.close()
+
+
+class StubTranscriber:
+    """Stands in for AudioToTextRecorder in java-bench
+
+    Holds the GIL for frame_ms on every frame (VAD) and for pass_ms every
+    pass_every frames (a realtime transcription pass), which is what stalls
+    the GUI and TTS threads when recognition runs in the same process.
+    """
+    def __init__(self, frame_ms=3.0, pass_ms=25.0, pass_every=3, use_microphone=False,
+                 on_realtime_transcription_update=None, **config):
+        self.frame_ms = frame_ms
+        self.pass_ms = pass_ms
+        self.pass_every = pass_every
+        self.on_realtime_transcription_update = on_realtime_transcription_update
+        self.post_speech_silence_duration = config.get("post_speech_silence_duration", 0.4)
+        self.min_length_of_recording = config.get("min_length_of_recording", 1.0)
+        self.frames = 0
+        self._stopped = threading.Event()
+        # sum(range(n)) runs in C without releasing the GIL; size n to about 1 ms
+        start = time.perf_counter()
+        sum(range(200000))
+        self._per_ms = int(200000 / ((time.perf_counter() - start) * 1000))
+
+    def _hold_gil(self, ms):
+        sum(range(int(self._per_ms * ms)))
+
+    def feed_audio(self, chunk, original_sample_rate=SAMPLE_RATE):
+        self._hold_gil(self.frame_ms)
+        self.frames += 1
+        if self.frames % self.pass_every == 0:
+            self._hold_gil(self.pass_ms)
+            if self.on_realtime_transcription_update:
+                self.on_realtime_transcription_update(f"frame {self.frames}")
+
+    def text(self):
+        self._stopped.wait(1.0)
+        return f"{self.frames} frames"
+
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,194 @@
+"""
+java_tts_pipeline - Pipelined sentence-by-sentence speech synthesis for Java-the-hud
+The next few sentences are synthesized while the current one plays, hiding network round trips
+Designed by Clay Burkhead
+"""
+
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Sentences shorter than this are merged with the next one to avoid choppy audio
+MIN_SENTENCE_CHARS = 20
+
+# Inter-sentence gaps kept for inspection; older ones are discarded
+GAP_HISTORY = 1000
+
+SENTENCE_END = re.compile(r"(?<=[.!?…])[\"')\]]*\s+")
+
+
+def split_sentences(text, min_chars=MIN_SENTENCE_CHARS):
+    """Split text into sentences, merging fragments shorter than min_chars"""
+    sentences = []
+    carry = ""
+    for part in SENTENCE_END.split(text.strip()):
+        part = part.strip()
+        if not part:
+            continue
+        carry = f"{carry} {part}" if carry else part
+        if len(carry) >= min_chars:
+            sentences.append(carry)
+            carry = ""
+    if carry:
+        if sentences and len(carry) < min_chars:
+            sentences[-1] = f"{sentences[-1]} {carry}"
+        else:
+            sentences.append(carry)
+    return sentences
+
+
+class ElevenLabsSynthesizer:
+    """Synthesize one sentence to raw 16-bit mono PCM with the ElevenLabs API"""
+    def __init__(self, api_key, voice_id, model_id="eleven_turbo_v2_5", sample_rate=22050):
+        from elevenlabs.client import ElevenLabs
+        self.client = ElevenLabs(api_key=api_key)
+        self.voice_id = voice_id
+        self.model_id = model_id
+        self.sample_rate = sample_rate
+
+    def __call__(self, text):
+        audio = self.client.text_to_speech.convert(
+            voice_id=self.voice_id,
+            text=text,
+            model_id=self.model_id,
+            output_format=f"pcm_{self.sample_rate}"
+        )
+        return b"".join(audio)
+
+
+class PyAudioPlayer:
+    """Play raw 16-bit mono PCM through PyAudio, stoppable between chunks
+
+    play() returns early once cancel is set or stop() is called while it is
+    playing; a stop() from before play() started has no effect on it.
+    """
+    def __init__(self, sample_rate=22050, chunk_bytes=4096):
+        import pyaudio
+        self._pyaudio = pyaudio.PyAudio()
+        self._stream = self._pyaudio.open(format=pyaudio.paInt16, channels=1,
+                                          rate=sample_rate, output=True)
+        self.chunk_bytes = chunk_bytes
+        self._stops = 0
+
+    def play(self, audio, on_audio_chunk=None, cancel=None):
+        stops = self._stops
+        for i in range(0, len(audio), self.chunk_bytes):
+            if self._stops != stops or (cancel is not None and cancel.is_set()):
+                return
+            chunk = audio[i:i + self.chunk_bytes]
+            self._stream.write(chunk)
+            if on_audio_chunk:
+                on_audio_chunk(chunk)
+
+    def stop(self):
+        self._stops += 1
+
+
+class SpeechPipeline:
+    """Drop-in for the parts of TextToAudioStream the assistant uses
+
+    feed() collects text and play_async() speaks it sentence by sentence.
+    Up to lookahead sentences are synthesized concurrently while the current
+    one plays; audio is always played in order. lookahead=0 synthesizes each
+    sentence only after the previous one finished playing. The gap between
+    the end of one sentence and the start of the next is recorded in gaps
+    (the last GAP_HISTORY of them).
+    Every job queued since the last stop() shares one cancel event, so stop()
+    silences the reply that is playing and every reply queued behind it.
+    """
+    def __init__(self, synthesize, player, lookahead=2):
+        self.synthesize = synthesize
+        self.player = player
+        self.lookahead = lookahead
+        self.gaps = deque(maxlen=GAP_HISTORY)
+        self._text = []
+        self._pool = ThreadPoolExecutor(max_workers=max(1, lookahead), thread_name_prefix="java-tts")
+        self._thread = None
+        self._cancel = threading.Event()
+
+    def feed(self, text):
+        self._text.append(text)
+        return self
+
+    def play_async(self, on_audio_chunk=None):
+        text, self._text = " ".join(self._text), []
+        sentences = split_sentences(text)
+        if not sentences:
+            return
+        self._start(self._run, sentences, on_audio_chunk)
+
+    def play_audio(self, audio, on_audio_chunk=None):
+        """Play already synthesized audio, such as a cached filler phrase"""
+        self._start(self._play_cached, audio, on_audio_chunk)
+
+    def _start(self, target, payload, on_audio_chunk):
+        # Whatever is still playing finishes first; the new thread waits for it
+        # before playing but may already start synthesizing
+        previous = self._thread if self._thread and self._thread.is_alive() else None
+        self._thread = threading.Thread(
+            target=target, args=(payload, self._cancel, on_audio_chunk, previous), daemon=True
+        )
+        self._thread.start()
+
+    def play(self, on_audio_chunk=None):
+        self.play_async(on_audio_chunk)
+        if self._thread:
+            self._thread.join()
+
+    def is_playing(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def stop(self):
+        # Jobs already queued keep the old, now set, event; later ones get a fresh one
+        cancel, self._cancel = self._cancel, threading.Event()
+        cancel.set()
+        self.player.stop()
+        self._text = []
+
+    def _safe_synthesize(self, sentence, cancel):
+        if cancel.is_set():
+            return None
+        try:
+            return self.synthesize(sentence)
+        except Exception as e:
+            print(f"TTS synthesis failed: {e}")
+            return None
+
+    def _play_cached(self, audio, cancel, on_audio_chunk, previous):
+        if previous:
+            previous.join()
+        if not cancel.is_set():
+            self.player.play(audio, on_audio_chunk, cancel)
+
+    def _run(self, sentences, cancel, on_audio_chunk, previous):
+        pending = deque(sentences)
+        in_flight = deque()
+
+        def top_up(limit):
+            while pending and len(in_flight) < limit:
+                in_flight.append(self._pool.submit(self._safe_synthesize, pending.popleft(), cancel))
+
+        top_up(max(1, self.lookahead))
+        if previous:
+            previous.join()
+        last_end = None
+        while in_flight and not cancel.is_set():
+            audio = in_flight.popleft().result()
+            if self.lookahead:
+                # Keep the next sentences synthesizing while this one plays
+                top_up(self.lookahead)
+
+            if audio is not None and not cancel.is_set():
+                start = time.perf_counter()
+                if last_end is not None:
+                    self.gaps.append(start - last_end)
+                self.player.play(audio, on_audio_chunk, cancel)
+                last_end = time.perf_counter()
+
+            if not self.lookahead:
+                top_up(1)
+
+        for future in in_flight:
+            future.cancel()